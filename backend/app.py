@@ -3,10 +3,13 @@ import os
 from flask import Flask, jsonify, send_from_directory
 from flask_cors import CORS
 
+from .cache import detail_cache
 from .config import Config
 from .database import bcrypt, db
 from .models import Event, Listing, User  # noqa: F401
+from .profiling import init_profiling
 from .routes import register_blueprints
+from .schema_upgrade import backfill_price_buckets, upgrade as upgrade_schema
 
 
 def create_app(config_class: type[Config] = Config) -> Flask:
@@ -27,14 +30,18 @@ def create_app(config_class: type[Config] = Config) -> Flask:
     ]
     # Remove duplicates while preserving order
     allowed_origins = list(dict.fromkeys(allowed_origins))
-    CORS(app, origins=allowed_origins, supports_credentials=True, allow_headers=['Content-Type', 'Authorization'])
+    CORS(app, origins=allowed_origins, supports_credentials=True, allow_headers=['Content-Type', 'Authorization', 'X-Profile-Token'])
     
     db.init_app(app)
     bcrypt.init_app(app)
+    detail_cache.init_app(app)
+    init_profiling(app)
 
-    # Create database tables if they don't exist
+    # Create database tables if they don't exist, then add columns and indexes newer models expect
     with app.app_context():
         db.create_all()
+        for change in upgrade_schema(db.engine) + backfill_price_buckets():
+            print(f"🔧 Schema upgrade: {change}")
         
         # Seed initial data if helper account doesn't exist
         from .models import User
@@ -57,7 +64,7 @@ def create_app(config_class: type[Config] = Config) -> Flask:
 
     @app.get("/uploads/<path:filename>")
     def serve_upload(filename):
-        upload_dir = os.path.join(app.root_path, "uploads")
+        upload_dir = app.config["UPLOAD_DIR"]
         # Create uploads directory if it doesn't exist
         os.makedirs(upload_dir, exist_ok=True)
         # Add CORS headers for image serving
@@ -69,10 +76,16 @@ def create_app(config_class: type[Config] = Config) -> Flask:
     return app
 
 
-app = create_app()
+def __getattr__(name):
+    # `gunicorn backend.app:app` builds the app on first access, so importing the package
+    # (tests, CLI tools) does not open, upgrade or seed the configured database
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "5000"))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    create_app().run(host="0.0.0.0", port=port, debug=True)
 
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from http import HTTPStatus
+from threading import Lock
+
+from flask import current_app, jsonify, request
+
+
+class DetailCache:
+    """Per-process LRU of serialized detail payloads, keyed by (kind, id).
+
+    Every entry remembers the row version it was built from. ``get`` only returns
+    it while the version matches, so a verify or delete in another worker process
+    (which bumps or removes the row) invalidates it here as well.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def init_app(self, app) -> None:
+        self.maxsize = app.config["DETAIL_CACHE_SIZE"]
+        self.clear()
+
+    def get(self, kind: str, item_id: int, version: str):
+        with self._lock:
+            entry = self._entries.get((kind, item_id))
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end((kind, item_id))
+            return entry[1]
+
+    def set(self, kind: str, item_id: int, version: str, payload) -> None:
+        with self._lock:
+            self._entries[(kind, item_id)] = (version, payload)
+            self._entries.move_to_end((kind, item_id))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, kind: str, item_id: int) -> None:
+        with self._lock:
+            self._entries.pop((kind, item_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+detail_cache = DetailCache()
+
+
+def detail_response(kind: str, item_id: int, version: str, build):
+    """Serve one resource from the detail cache with an ETag derived from its version.
+
+    ``build`` loads and serializes the resource; it only runs on a cache miss, and a
+    matching ``If-None-Match`` short-circuits before the cache is even consulted.
+    """
+    etag = f"{kind}-{item_id}-{version}"
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=HTTPStatus.NOT_MODIFIED)
+    else:
+        payload = detail_cache.get(kind, item_id, version)
+        if payload is None:
+            payload = build()
+            detail_cache.set(kind, item_id, version, payload)
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
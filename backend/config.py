@@ -20,6 +20,45 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-me")
     BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", "12"))
 
+    # Price histogram used by /api/listings/stats; the last bucket collects everything above the range
+    LISTING_STATS_BUCKET_WIDTH = float(os.getenv("LISTING_STATS_BUCKET_WIDTH", "50"))
+    LISTING_STATS_BUCKET_COUNT = int(os.getenv("LISTING_STATS_BUCKET_COUNT", "100"))
+
+    # Near-duplicate listing detection: "flag" marks duplicate_of_id, "reject" refuses the listing, "off" skips it
+    LISTING_DEDUP_ACTION = os.getenv("LISTING_DEDUP_ACTION", "flag")
+    LISTING_DEDUP_THRESHOLD = float(os.getenv("LISTING_DEDUP_THRESHOLD", "0.8"))
+
+    # Memory-mapped vectors behind /api/listings/<id>/similar, built with `python -m backend.similarity`
+    SIMILAR_LISTINGS_INDEX_DIR = os.getenv(
+        "SIMILAR_LISTINGS_INDEX_DIR",
+        str(BASE_DIR / "instance" / "similar_listings"),
+    )
+
+    # POST /api/batch limits; concurrent GET items use up to BATCH_MAX_WORKERS threads
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
+    # Entries per worker in the listing/event detail LRU
+    DETAIL_CACHE_SIZE = int(os.getenv("DETAIL_CACHE_SIZE", "1024"))
+
+    # GET /api/listings/verification-queue: how long a claim lasts and the most listings one call may claim
+    VERIFICATION_LEASE_SECONDS = int(os.getenv("VERIFICATION_LEASE_SECONDS", "600"))
+    VERIFICATION_QUEUE_MAX_BATCH = int(os.getenv("VERIFICATION_QUEUE_MAX_BATCH", "50"))
+
+    # Standing searches per user; each new listing is matched against all of them through an in-memory index
+    SAVED_SEARCH_MAX_PER_USER = int(os.getenv("SAVED_SEARCH_MAX_PER_USER", "20"))
+
+    # Listing photos; `python -m backend.upload_store gc` removes unreferenced files older than the grace period
+    UPLOAD_DIR = os.getenv("UPLOAD_DIR", str(BASE_DIR / "uploads"))
+    UPLOAD_GC_GRACE_HOURS = float(os.getenv("UPLOAD_GC_GRACE_HOURS", "24"))
+
+    # Request profiling: every request when PROFILE_REQUESTS is set, otherwise only those with a signed
+    # X-Profile-Token header; the newest PROFILE_RING_SIZE profiles are kept in PROFILE_DIR
+    PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", str(BASE_DIR / "instance" / "profiles"))
+    PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "50"))
+    PROFILE_TOKEN_MAX_AGE = int(os.getenv("PROFILE_TOKEN_MAX_AGE", "3600"))
+
 
 class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
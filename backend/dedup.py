@@ -0,0 +1,248 @@
+"""Near-duplicate listing detection with MinHash and LSH banding.
+
+A listing is reduced to a set of tokens: 3-word shingles of its description plus a
+content hash per photo. The MinHash signature of that set estimates Jaccard
+similarity between listings, and the signature is split into bands so that only
+listings sharing at least one band bucket are ever compared.
+"""
+
+import hashlib
+import os
+import re
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import bindparam, select
+from werkzeug.security import safe_join
+
+from . import upload_store
+from .database import db
+from .models import Listing, ListingLshBand, ListingSignature, new_version
+
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+SHINGLE_SIZE = 3
+BATCH_CHUNK_SIZE = 10_000
+
+# Universal hashing (a * x + b) mod p with a 31-bit prime keeps every product inside uint64.
+_PRIME = np.uint64((1 << 31) - 1)
+# A fixed seed so every worker process and the batch command agree on the permutations.
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, int(_PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _token_hash(token: str) -> int:
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little") & 0x7FFFFFFF
+
+
+def photo_hash(photo: str, upload_dir: str | None = None) -> str:
+    """Content hash for an uploaded photo, or a hash of the URL for external photos.
+
+    Uploads are recognised in both stored forms, ``/uploads/...`` and the absolute
+    URL the frontend builds from it.
+    """
+    relative = upload_store.relative_path(photo)
+    if relative:
+        # safe_join refuses client-sent paths such as "/uploads/../secret" that leave the upload directory
+        path = safe_join(upload_dir, relative) if upload_dir else None
+        if path and os.path.isfile(path):
+            digest = hashlib.sha256()
+            with open(path, "rb") as handle:
+                for block in iter(lambda: handle.read(1 << 16), b""):
+                    digest.update(block)
+            return digest.hexdigest()
+        photo = upload_store.URL_PREFIX + relative
+    return hashlib.sha256(photo.encode("utf-8")).hexdigest()
+
+
+def tokens_for(description: str, photos: list | None, upload_dir: str | None = None) -> set[str]:
+    words = _WORD_RE.findall((description or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        tokens = set(words)
+    else:
+        tokens = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    tokens.update(f"photo:{photo_hash(photo, upload_dir)}" for photo in photos or [] if photo)
+    return tokens
+
+
+def minhash(tokens: set[str]) -> np.ndarray | None:
+    """MinHash signature (uint32 array) of a token set, or None when there is nothing to hash."""
+    if not tokens:
+        return None
+    values = np.fromiter((_token_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+    hashed = (np.outer(values, _A) + _B) % _PRIME
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> list[int]:
+    """One signed 64-bit bucket id per band of the signature."""
+    buckets = []
+    for band in range(NUM_BANDS):
+        chunk = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def similarity(left: np.ndarray, right: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(left == right))
+
+
+def signature_for_listing(description: str, photos: list | None) -> np.ndarray | None:
+    upload_dir = current_app.config["UPLOAD_DIR"]
+    return minhash(tokens_for(description, photos, upload_dir))
+
+
+def find_duplicate(signature: np.ndarray | None) -> tuple[int, float] | None:
+    """Best matching stored listing above the configured threshold, as (listing_id, similarity)."""
+    if signature is None:
+        return None
+    threshold = current_app.config["LISTING_DEDUP_THRESHOLD"]
+    band_filter = db.or_(
+        *(
+            db.and_(ListingLshBand.band == band, ListingLshBand.bucket == bucket)
+            for band, bucket in enumerate(band_buckets(signature))
+        )
+    )
+    candidates = select(ListingLshBand.listing_id).where(band_filter).distinct()
+    rows = db.session.execute(
+        select(ListingSignature.listing_id, ListingSignature.signature).where(ListingSignature.listing_id.in_(candidates))
+    )
+
+    best = None
+    for listing_id, stored in rows:
+        score = similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+        if score >= threshold and (best is None or score > best[1]):
+            best = (listing_id, score)
+    return best
+
+
+def index_listing(listing: Listing, signature: np.ndarray | None) -> None:
+    """Attach the signature and band rows to a listing so later inserts can find it."""
+    if signature is None:
+        return
+    listing.signature = ListingSignature(signature=signature.tobytes())
+    listing.lsh_bands = [
+        ListingLshBand(band=band, bucket=bucket) for band, bucket in enumerate(band_buckets(signature))
+    ]
+
+
+def find_duplicates(ids: np.ndarray, signatures: np.ndarray, threshold: float) -> dict[int, tuple[int, float]]:
+    """Map each listing id to its most similar earlier listing at or above ``threshold``.
+
+    ``ids`` must be ascending and ``signatures`` holds one row per id. Within every
+    band the signatures are grouped by sorting, and each group member is compared
+    only with the group's first and previous member, so the work grows with
+    n log n rather than with the number of listing pairs.
+    """
+    if len(ids) < 2:
+        return {}
+    left_parts, right_parts = [], []
+    for band in range(NUM_BANDS):
+        rows = np.ascontiguousarray(signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * ROWS_PER_BAND))).ravel()
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        same_as_previous = np.empty(len(order), dtype=bool)
+        same_as_previous[0] = False
+        same_as_previous[1:] = sorted_keys[1:] == sorted_keys[:-1]
+        group_start = np.maximum.accumulate(np.where(same_as_previous, 0, np.arange(len(order))))
+        members = np.nonzero(same_as_previous)[0]
+        left_parts += [order[members], order[members]]
+        right_parts += [order[members - 1], order[group_start[members]]]
+
+    if not left_parts:
+        return {}
+    pairs = np.unique(np.stack([np.concatenate(left_parts), np.concatenate(right_parts)], axis=1), axis=0)
+    if not len(pairs):
+        return {}
+
+    matches: dict[int, tuple[int, float]] = {}
+    for start in range(0, len(pairs), BATCH_CHUNK_SIZE):
+        block = pairs[start:start + BATCH_CHUNK_SIZE]
+        scores = np.mean(signatures[block[:, 0]] == signatures[block[:, 1]], axis=1)
+        for (later, earlier), score in zip(block.tolist(), scores.tolist()):
+            if score < threshold:
+                continue
+            later_id, earlier_id = int(ids[later]), int(ids[earlier])
+            current = matches.get(later_id)
+            if current is None or (score, -earlier_id) > (current[1], -current[0]):
+                matches[later_id] = (earlier_id, score)
+    return matches
+
+
+def dedup_existing() -> tuple[int, int]:
+    """Rebuild the signature/band tables and flag duplicates among existing listings.
+
+    Listings are streamed once to compute signatures and write the index rows, then
+    candidate pairs are found in bulk with ``find_duplicates``. The oldest copy of a
+    group stays unflagged and listings already flagged keep their original match.
+    Returns (listings indexed, duplicates flagged).
+    """
+    upload_dir = current_app.config["UPLOAD_DIR"]
+    ListingLshBand.query.delete(synchronize_session=False)
+    ListingSignature.query.delete(synchronize_session=False)
+
+    ids: list[int] = []
+    already_flagged: set[int] = set()
+    signatures: list[np.ndarray] = []
+    rows = db.session.execute(
+        select(Listing.id, Listing.description, Listing.photos, Listing.duplicate_of_id)
+        .order_by(Listing.id)
+        .execution_options(yield_per=BATCH_CHUNK_SIZE)
+    )
+    for chunk in rows.partitions():
+        signature_rows, band_rows = [], []
+        for listing_id, description, photos, duplicate_of_id in chunk:
+            signature = minhash(tokens_for(description, photos, upload_dir))
+            if signature is None:
+                continue
+            ids.append(listing_id)
+            signatures.append(signature)
+            if duplicate_of_id is not None:
+                already_flagged.add(listing_id)
+            signature_rows.append({"listing_id": listing_id, "signature": signature.tobytes()})
+            band_rows.extend(
+                {"listing_id": listing_id, "band": band, "bucket": bucket}
+                for band, bucket in enumerate(band_buckets(signature))
+            )
+        if signature_rows:
+            db.session.execute(ListingSignature.__table__.insert(), signature_rows)
+            db.session.execute(ListingLshBand.__table__.insert(), band_rows)
+
+    matches = {}
+    if signatures:
+        matches = find_duplicates(
+            np.asarray(ids, dtype=np.int64), np.vstack(signatures), current_app.config["LISTING_DEDUP_THRESHOLD"]
+        )
+    duplicate_rows = [
+        {"listing_id": listing_id, "match_id": match_id, "new_version": new_version()}
+        for listing_id, (match_id, _) in matches.items()
+        if listing_id not in already_flagged
+    ]
+    # Flags are written after the scan so the listings cursor is never updated under itself.
+    if duplicate_rows:
+        listings = Listing.__table__
+        db.session.execute(
+            listings.update()
+            .where(listings.c.id == bindparam("listing_id"))
+            .values(duplicate_of_id=bindparam("match_id"), version=bindparam("new_version")),
+            duplicate_rows,
+        )
+    db.session.commit()
+    return len(ids), len(duplicate_rows)
+
+
+if __name__ == "__main__":
+    from .app import create_app
+
+    app = create_app()
+    with app.app_context():
+        indexed, flagged = dedup_existing()
+        print(f"✅ Indexed {indexed} listings, flagged {flagged} near-duplicates.")
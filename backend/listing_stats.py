@@ -0,0 +1,233 @@
+"""Materialized price statistics for housing listings.
+
+Prices are kept as a fixed-width histogram per (location, verified) group in the
+``listing_price_buckets`` table. The create/verify/delete handlers adjust single
+buckets in the same transaction as the listing change, and ``rebuild()`` recomputes
+the whole table in bulk with NumPy.
+"""
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .database import db
+from .models import Listing, ListingPriceBucket
+
+PERCENTILES = (10, 25, 50, 75, 90)
+REBUILD_CHUNK_SIZE = 50_000
+
+
+def _bucket_settings():
+    return (
+        current_app.config["LISTING_STATS_BUCKET_WIDTH"],
+        current_app.config["LISTING_STATS_BUCKET_COUNT"],
+    )
+
+
+def _bucket_for(price: float) -> int:
+    width, count = _bucket_settings()
+    return min(max(int(price // width), 0), count - 1)
+
+
+def _grouped(rows) -> dict[tuple[str, bool, int], list]:
+    groups: dict[tuple[str, bool, int], list] = {}
+    for location, verified, price in rows:
+        price = float(price)
+        entry = groups.setdefault((location, bool(verified), _bucket_for(price)), [0, 0.0])
+        entry[0] += 1
+        entry[1] += price
+    return groups
+
+
+def _add_rows(rows) -> None:
+    """Count many (location, verified, price) rows with one upsert.
+
+    ``INSERT ... ON CONFLICT DO UPDATE`` creates a missing bucket and increments an
+    existing one atomically, so two workers adding the first listing of a bucket at
+    the same time cannot both try to insert it.
+    """
+    increments = _grouped(rows)
+    if not increments:
+        return
+    buckets = ListingPriceBucket.__table__
+    insert = postgresql.insert if db.session.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = insert(buckets)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[buckets.c.location, buckets.c.verified, buckets.c.bucket],
+            set_={
+                "count": buckets.c.count + statement.excluded.count,
+                "total": buckets.c.total + statement.excluded.total,
+            },
+        ),
+        [
+            {"location": location, "verified": verified, "bucket": bucket, "count": count, "total": total}
+            for (location, verified, bucket), (count, total) in increments.items()
+        ],
+    )
+
+
+def forget_rows(rows) -> None:
+    """Remove many (location, verified, price) rows with a single executemany update."""
+    decrements = _grouped(rows)
+    if not decrements:
+        return
+    buckets = ListingPriceBucket.__table__
+    db.session.execute(
+        buckets.update()
+        .where(
+            buckets.c.location == bindparam("b_location"),
+            buckets.c.verified == bindparam("b_verified"),
+            buckets.c.bucket == bindparam("b_bucket"),
+        )
+        .values(count=buckets.c.count - bindparam("b_count"), total=buckets.c.total - bindparam("b_total")),
+        [
+            {"b_location": location, "b_verified": verified, "b_bucket": bucket, "b_count": count, "b_total": total}
+            for (location, verified, bucket), (count, total) in decrements.items()
+        ],
+    )
+
+
+def record_listing(listing: Listing) -> None:
+    """Count a newly created listing. Call before the session is committed."""
+    _add_rows([(listing.location, listing.verified, listing.price)])
+
+
+def forget_listing(listing: Listing) -> None:
+    """Remove a listing that is about to be deleted."""
+    forget_rows([(listing.location, listing.verified, listing.price)])
+
+
+def record_verifications(rows) -> None:
+    """Move many (location, price) rows from the unverified to the verified group in bulk."""
+    rows = list(rows)
+    forget_rows((location, False, price) for location, price in rows)
+    _add_rows((location, True, price) for location, price in rows)
+
+
+def rebuild() -> int:
+    """Recompute every bucket from the listings table. Returns the number of listings counted."""
+    width, bucket_count = _bucket_settings()
+    groups: dict[tuple[str, bool], int] = {}
+    counts = np.zeros((0, bucket_count), dtype=np.int64)
+    totals = np.zeros((0, bucket_count), dtype=np.float64)
+    seen = 0
+
+    rows = db.session.execute(
+        select(Listing.location, Listing.verified, Listing.price).execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    )
+    for chunk in rows.partitions():
+        group_ids = np.fromiter(
+            (groups.setdefault((location, bool(verified)), len(groups)) for location, verified, _ in chunk),
+            dtype=np.int64,
+            count=len(chunk),
+        )
+        prices = np.fromiter((price for _, _, price in chunk), dtype=np.float64, count=len(chunk))
+        buckets = np.clip(np.floor_divide(prices, width).astype(np.int64), 0, bucket_count - 1)
+
+        if len(groups) > counts.shape[0]:
+            grow = len(groups) - counts.shape[0]
+            counts = np.vstack([counts, np.zeros((grow, bucket_count), dtype=np.int64)])
+            totals = np.vstack([totals, np.zeros((grow, bucket_count), dtype=np.float64)])
+
+        flat = group_ids * bucket_count + buckets
+        size = counts.size
+        counts += np.bincount(flat, minlength=size).reshape(counts.shape)
+        totals += np.bincount(flat, weights=prices, minlength=size).reshape(totals.shape)
+        seen += len(chunk)
+
+    ListingPriceBucket.query.delete(synchronize_session=False)
+    group_rows, bucket_rows = np.nonzero(counts)
+    keys = list(groups)
+    if len(group_rows):
+        db.session.execute(
+            ListingPriceBucket.__table__.insert(),
+            [
+                {
+                    "location": keys[g][0],
+                    "verified": keys[g][1],
+                    "bucket": int(b),
+                    "count": int(counts[g, b]),
+                    "total": float(totals[g, b]),
+                }
+                for g, b in zip(group_rows.tolist(), bucket_rows.tolist())
+            ],
+        )
+    db.session.commit()
+    return seen
+
+
+def summarize(counts: np.ndarray, total: float) -> dict:
+    """Turn a dense bucket histogram into count/mean/median/percentile figures.
+
+    Percentiles are interpolated linearly inside a bucket, so they are accurate to
+    one bucket width.
+    """
+    width, bucket_count = _bucket_settings()
+    n = int(counts.sum())
+    if n == 0:
+        return {"count": 0, "mean": None, "median": None, "percentiles": {}, "histogram": []}
+
+    cumulative = np.cumsum(counts)
+    percentiles = {}
+    for p in PERCENTILES:
+        rank = p / 100 * n
+        bucket = int(np.searchsorted(cumulative, rank, side="left"))
+        before = cumulative[bucket - 1] if bucket else 0
+        inside = counts[bucket]
+        fraction = (rank - before) / inside if inside else 0.0
+        if bucket == bucket_count - 1:
+            fraction = 0.0
+        percentiles[str(p)] = round(float((bucket + fraction) * width), 2)
+
+    histogram = [
+        {
+            "min": float(b * width),
+            "max": float((b + 1) * width) if b < bucket_count - 1 else None,
+            "count": int(counts[b]),
+        }
+        for b in np.nonzero(counts)[0].tolist()
+    ]
+    return {
+        "count": n,
+        "mean": round(total / n, 2),
+        "median": percentiles["50"],
+        "percentiles": percentiles,
+        "histogram": histogram,
+    }
+
+
+def collect(location: str | None = None, verified: bool | None = None) -> dict:
+    """Statistics for all groups matching the filters, plus an overall figure across them."""
+    _, bucket_count = _bucket_settings()
+    query = ListingPriceBucket.query.filter(ListingPriceBucket.count > 0)
+    if location is not None:
+        query = query.filter(ListingPriceBucket.location == location)
+    if verified is not None:
+        query = query.filter(ListingPriceBucket.verified == verified)
+
+    groups: dict[tuple[str, bool], list] = {}
+    for row in query:
+        group = groups.setdefault((row.location, row.verified), [np.zeros(bucket_count, dtype=np.int64), 0.0])
+        group[0][row.bucket] += row.count
+        group[1] += row.total
+
+    overall_counts = np.zeros(bucket_count, dtype=np.int64)
+    overall_total = 0.0
+    results = []
+    for (group_location, group_verified), (counts, total) in sorted(groups.items()):
+        overall_counts += counts
+        overall_total += total
+        results.append({"location": group_location, "verified": group_verified, **summarize(counts, total)})
+
+    return {"overall": summarize(overall_counts, overall_total), "groups": results}
+
+
+if __name__ == "__main__":
+    from .app import create_app
+
+    app = create_app()
+    with app.app_context():
+        counted = rebuild()
+        print(f"✅ Rebuilt listing price statistics from {counted} listings.")
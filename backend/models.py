@@ -1,8 +1,15 @@
+from uuid import uuid4
+
 from sqlalchemy import JSON, func
 
 from .database import bcrypt, db
 
 
+def new_version() -> str:
+    """Random version token; unlike a counter it never repeats when a row id is reused."""
+    return uuid4().hex
+
+
 class User(db.Model):
     __tablename__ = "users"
 
@@ -13,9 +20,9 @@ class User(db.Model):
     role = db.Column(db.String(50), nullable=False, default="student")
     created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
 
-    listings = db.relationship("Listing", foreign_keys="Listing.owner_id", back_populates="owner", cascade="all, delete")
-    events = db.relationship("Event", back_populates="creator", cascade="all, delete")
-    comments = db.relationship("Comment", back_populates="author", cascade="all, delete")
+    listings = db.relationship("Listing", foreign_keys="Listing.owner_id", back_populates="owner", cascade="all, delete", passive_deletes=True)
+    events = db.relationship("Event", back_populates="creator", cascade="all, delete", passive_deletes=True)
+    comments = db.relationship("Comment", back_populates="author", cascade="all, delete", passive_deletes=True)
 
     def set_password(self, password: str) -> None:
         self.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
@@ -35,14 +42,36 @@ class Listing(db.Model):
     contact = db.Column(db.String(120), nullable=False)
     photos = db.Column(JSON, nullable=False, default=list)
     verified = db.Column(db.Boolean, default=False, nullable=False)
-    verified_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
-    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
-
-    owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    verified_by_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    duplicate_of_id = db.Column(
+        db.Integer, db.ForeignKey("listings.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False, index=True)
+    # Replaced whenever the detail payload changes; keys the detail cache and ETags
+    version = db.Column(db.String(32), nullable=False, default=new_version)
+    # Verification queue lease: the helper working on this listing until claim_expires_at
+    claimed_by_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    claim_expires_at = db.Column(db.DateTime, nullable=True)
+
+    owner_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     owner = db.relationship("User", foreign_keys=[owner_id], back_populates="listings")
     verified_by = db.relationship("User", foreign_keys=[verified_by_id])
 
-    comments = db.relationship("Comment", back_populates="listing", cascade="all, delete")
+    comments = db.relationship("Comment", back_populates="listing", cascade="all, delete", passive_deletes=True)
+    signature = db.relationship(
+        "ListingSignature", back_populates="listing", uselist=False, cascade="all, delete", passive_deletes=True
+    )
+    lsh_bands = db.relationship("ListingLshBand", back_populates="listing", cascade="all, delete", passive_deletes=True)
+
+    __table_args__ = (
+        # Only unverified listings, in queue order; stays small however many listings are verified
+        db.Index(
+            "ix_listings_verification_queue",
+            "id",
+            postgresql_where=db.text("verified = false"),
+            sqlite_where=db.text("verified = 0"),
+        ),
+    )
 
 
 class Event(db.Model):
@@ -51,15 +80,16 @@ class Event(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False, index=True)
     location = db.Column(db.String(150), nullable=False)
     iframe_url = db.Column(db.String(500), nullable=True)
     created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    version = db.Column(db.String(32), nullable=False, default=new_version)
 
-    created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    created_by_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     creator = db.relationship("User", back_populates="events")
 
-    comments = db.relationship("Comment", back_populates="event", cascade="all, delete")
+    comments = db.relationship("Comment", back_populates="event", cascade="all, delete", passive_deletes=True)
 
 
 class Comment(db.Model):
@@ -69,11 +99,118 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
 
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    listing_id = db.Column(db.Integer, db.ForeignKey("listings.id"), nullable=True)
-    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    listing_id = db.Column(db.Integer, db.ForeignKey("listings.id", ondelete="CASCADE"), nullable=True, index=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=True, index=True)
 
     author = db.relationship("User", back_populates="comments")
     listing = db.relationship("Listing", back_populates="comments")
     event = db.relationship("Event", back_populates="comments")
 
+
+class ListingPriceBucket(db.Model):
+    """Summary row: how many listings in a (location, verified) group fall into one price bucket."""
+
+    __tablename__ = "listing_price_buckets"
+    __table_args__ = (db.UniqueConstraint("location", "verified", "bucket", name="uq_listing_price_bucket"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    location = db.Column(db.String(150), nullable=False, index=True)
+    verified = db.Column(db.Boolean, nullable=False)
+    bucket = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class ListingSignature(db.Model):
+    """MinHash signature of a listing's description shingles and photo hashes."""
+
+    __tablename__ = "listing_signatures"
+
+    listing_id = db.Column(db.Integer, db.ForeignKey("listings.id", ondelete="CASCADE"), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)
+
+    listing = db.relationship("Listing", back_populates="signature")
+
+
+class ListingLshBand(db.Model):
+    """One LSH band of a listing signature; listings sharing a (band, bucket) are duplicate candidates."""
+
+    __tablename__ = "listing_lsh_bands"
+    __table_args__ = (db.Index("ix_listing_lsh_bands_lookup", "band", "bucket"),)
+
+    listing_id = db.Column(db.Integer, db.ForeignKey("listings.id", ondelete="CASCADE"), primary_key=True)
+    band = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
+    listing = db.relationship("Listing", back_populates="lsh_bands")
+
+
+class SavedSearch(db.Model):
+    """A user's standing search; new listings that match it are queued in the user's inbox."""
+
+    __tablename__ = "saved_searches"
+    # Ids are never reused, so a worker's in-memory predicate index cannot mistake a new search for a deleted one
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=True)
+    min_price = db.Column(db.Float, nullable=True)
+    max_price = db.Column(db.Float, nullable=True)
+    # Lower-cased location terms; a listing matches when its location contains every word of any one term
+    location_terms = db.Column(JSON, nullable=False, default=list)
+    verified_only = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+
+class SavedSearchMatch(db.Model):
+    """Inbox entry: a listing that matched one of the user's saved searches."""
+
+    __tablename__ = "saved_search_matches"
+    __table_args__ = (
+        db.UniqueConstraint("saved_search_id", "listing_id", name="uq_saved_search_match"),
+        db.Index("ix_saved_search_matches_inbox", "user_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    saved_search_id = db.Column(
+        db.Integer, db.ForeignKey("saved_searches.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    listing_id = db.Column(db.Integer, db.ForeignKey("listings.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    listing = db.relationship("Listing")
+
+
+class SavedSearchIndexVersion(db.Model):
+    """Single row replaced whenever a saved search is added; workers rebuild their predicate index when it changes."""
+
+    __tablename__ = "saved_search_index_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.String(32), nullable=False, default=new_version)
+
+
+class UploadShardUsage(db.Model):
+    """Upload storage in one top-level shard as of its last sweep, plus the uploads added since.
+
+    Files a sweep keeps are either referenced or pending; orphaned files are
+    removed, so they are not counted here.
+    ``shard`` is the two hex digits of the directory, or an empty string for the
+    flat legacy files. ``swept_at`` is None until a gc run has walked the shard.
+    """
+
+    __tablename__ = "upload_shard_usage"
+
+    shard = db.Column(db.String(2), primary_key=True)
+    files = db.Column(db.BigInteger, nullable=False, default=0)
+    bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    referenced_files = db.Column(db.BigInteger, nullable=False, default=0)
+    referenced_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    pending_files = db.Column(db.BigInteger, nullable=False, default=0)
+    pending_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    swept_at = db.Column(db.Float, nullable=True)
@@ -0,0 +1,241 @@
+"""On-demand request profiling.
+
+A request is profiled when ``PROFILE_REQUESTS`` is on, or when it carries an
+``X-Profile-Token`` header minted with ``python -m backend.profiling token``. The
+header is signed with ``SECRET_KEY`` and expires after ``PROFILE_TOKEN_MAX_AGE``
+seconds. Otherwise the only cost per request is one config lookup and one
+header lookup.
+
+Profiled requests run under a deterministic ``sys.setprofile`` tracer on the
+handler thread. It also sees C calls such as bcrypt, which hold the GIL and
+would be invisible to a sampling thread. Self time is attributed to SQL,
+marshmallow ``dump``, bcrypt or JSON encoding by the innermost matching frame.
+The result is written to ``PROFILE_DIR`` in collapsed-stack format (for
+flamegraph.pl / inferno) and as a speedscope JSON file. Only the newest
+``PROFILE_RING_SIZE`` profiles are kept, and the response's ``X-Profile-Id``
+header names the files.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+TOKEN_HEADER = "X-Profile-Token"
+TOKEN_SALT = "request-profiling"
+ENVIRON_KEY = "windsor_hub.profiler"
+
+# Module prefixes per category; the innermost matching frame of a stack wins
+CATEGORIES = (
+    ("bcrypt", ("bcrypt", "flask_bcrypt")),
+    ("sql", ("sqlalchemy.engine", "sqlalchemy.dialects", "sqlite3", "psycopg2")),
+    ("marshmallow", ("marshmallow", "marshmallow_sqlalchemy")),
+    ("json", ("json", "_json", "flask.json")),
+)
+
+_active = threading.local()
+
+
+def _serializer(app) -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(app.config["SECRET_KEY"], salt=TOKEN_SALT)
+
+
+def make_token(app) -> str:
+    return _serializer(app).dumps("profile")
+
+
+def _token_valid(app, token: str) -> bool:
+    try:
+        _serializer(app).loads(token, max_age=app.config["PROFILE_TOKEN_MAX_AGE"])
+    except BadSignature:
+        return False
+    return True
+
+
+def _category(stack) -> str:
+    for name in reversed(stack):
+        module = name.split(":", 1)[0]
+        for category, prefixes in CATEGORIES:
+            if any(module == prefix or module.startswith(prefix + ".") for prefix in prefixes):
+                return category
+    return "other"
+
+
+class StackProfiler:
+    """Deterministic profiler that accumulates self time per call stack on one thread."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.stack = [root]
+        self.self_time: Counter = Counter()  # stack tuple -> nanoseconds
+        self.frames: dict[str, tuple[str, int]] = {root: ("", 0)}
+        self.elapsed = 0.0
+        self._started_at = self._last = time.perf_counter_ns()
+
+    def _name(self, frame, event, arg) -> str:
+        if event == "c_call":
+            owner = getattr(arg, "__self__", None)
+            module = arg.__module__ or (type(owner).__module__ if owner is not None else "builtins")
+            name = f"{module}:{arg.__qualname__}"
+            self.frames.setdefault(name, ("", 0))
+        else:
+            code = frame.f_code
+            name = f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+            self.frames.setdefault(name, (code.co_filename, code.co_firstlineno))
+        return name
+
+    def _event(self, frame, event, arg) -> None:
+        now = time.perf_counter_ns()
+        self.self_time[tuple(self.stack)] += now - self._last
+        if event in ("call", "c_call"):
+            self.stack.append(self._name(frame, event, arg))
+        elif len(self.stack) > 1:
+            # Returns from frames entered before profiling started find only the root
+            self.stack.pop()
+        self._last = time.perf_counter_ns()
+
+    def start(self) -> None:
+        sys.setprofile(self._event)
+
+    def stop(self) -> None:
+        sys.setprofile(None)
+        self.elapsed = (time.perf_counter_ns() - self._started_at) / 1e9
+
+    def categories(self) -> Counter:
+        totals: Counter = Counter()
+        for stack, nanoseconds in self.self_time.items():
+            totals[_category(stack)] += nanoseconds
+        return totals
+
+
+def _collapsed(profiler: StackProfiler) -> str:
+    """One ``frame;frame;frame microseconds`` line per distinct stack."""
+    lines = []
+    for stack, nanoseconds in profiler.self_time.most_common():
+        if nanoseconds >= 1000:
+            lines.append(f"{';'.join(stack)} {nanoseconds // 1000}\n")
+    return "".join(lines)
+
+
+def _speedscope(profiler: StackProfiler, name: str) -> dict:
+    frame_index = {frame: index for index, frame in enumerate(profiler.frames)}
+    samples, weights = [], []
+    for stack, nanoseconds in profiler.self_time.items():
+        samples.append([frame_index[frame] for frame in stack])
+        weights.append(nanoseconds / 1e9)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "windsor-hub",
+        "shared": {
+            "frames": [
+                {"name": frame, "file": filename, "line": line} for frame, (filename, line) in profiler.frames.items()
+            ]
+        },
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+def _prune(directory: str, keep: int) -> None:
+    profiles = sorted({entry.split(".", 1)[0] for entry in os.listdir(directory) if entry[0].isdigit()})
+    for stale in profiles[:-keep] if keep else profiles:
+        for suffix in (".collapsed", ".speedscope.json", ".summary.json"):
+            path = os.path.join(directory, stale + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def write_profile(app, profiler: StackProfiler, endpoint: str, status: int) -> str:
+    """Write the three output files for one profile and return their shared stem."""
+    directory = app.config["PROFILE_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    label = re.sub(r"[^A-Za-z0-9_-]+", "_", endpoint or "unknown")
+    profile_id = f"{time.time_ns()}-{os.getpid()}-{label}"
+
+    with open(os.path.join(directory, f"{profile_id}.collapsed"), "w", encoding="utf-8") as handle:
+        handle.write(_collapsed(profiler))
+    with open(os.path.join(directory, f"{profile_id}.speedscope.json"), "w", encoding="utf-8") as handle:
+        json.dump(_speedscope(profiler, profiler.root), handle)
+    with open(os.path.join(directory, f"{profile_id}.summary.json"), "w", encoding="utf-8") as handle:
+        json.dump(
+            {
+                "request": profiler.root,
+                "status": status,
+                "wall_ms": round(profiler.elapsed * 1000, 2),
+                "attribution_ms": {
+                    category: round(nanoseconds / 1e6, 2)
+                    for category, nanoseconds in profiler.categories().most_common()
+                },
+            },
+            handle,
+        )
+    _prune(directory, app.config["PROFILE_RING_SIZE"])
+    return profile_id
+
+
+def _start_profiling():
+    if getattr(_active, "profiler", None) is not None:
+        return  # a batch sub-request inside a profiled request
+    app = current_app
+    token = request.headers.get(TOKEN_HEADER)
+    if not app.config["PROFILE_REQUESTS"] and not (token and _token_valid(app, token)):
+        return
+    profiler = StackProfiler(f"{request.method} {request.path}")
+    _active.profiler = profiler
+    request.environ[ENVIRON_KEY] = profiler
+    profiler.start()
+
+
+def _stop_profiling():
+    profiler = request.environ.pop(ENVIRON_KEY, None)
+    if profiler is not None:
+        profiler.stop()
+        _active.profiler = None
+    return profiler
+
+
+def _finish_profiling(response):
+    profiler = _stop_profiling()
+    if profiler is None:
+        return response
+    try:
+        profile_id = write_profile(current_app, profiler, request.endpoint, response.status_code)
+    except OSError:
+        current_app.logger.exception("Could not write request profile")
+    else:
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def _abandon_profiling(exc):
+    _stop_profiling()
+
+
+def init_profiling(app) -> None:
+    app.before_request(_start_profiling)
+    app.after_request(_finish_profiling)
+    app.teardown_request(_abandon_profiling)
+
+
+if __name__ == "__main__":
+    from .app import create_app
+
+    if sys.argv[1:] != ["token"]:
+        sys.exit("usage: python -m backend.profiling token")
+    print(f"{TOKEN_HEADER}: {make_token(create_app())}")
@@ -0,0 +1,449 @@
+"""Query-plan regression guard for the API endpoints.
+
+Seeds a large dataset, drives every registered route through the Flask test
+client, records each SQL statement it issues, and explains those statements
+against the same database. A route fails the guard when it issues more
+statements than its budget, or when a statement scans a table without an index
+(``SCAN <table>`` on SQLite, ``Seq Scan`` on PostgreSQL).
+
+    python -m backend.query_guard --listings 20000 --events 2000
+
+The exit status is non-zero when any route fails, so it can gate CI. Every
+route needs an entry in ``endpoint_cases``; an unlisted route fails too.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from . import dedup, listing_stats, saved_searches, similarity
+from .config import Config
+from .database import bcrypt, db
+from .models import Comment, Event, Listing, SavedSearch, SavedSearchIndexVersion, SavedSearchMatch, User
+
+SEED_CHUNK_SIZE = 5_000
+SKIPPED_ENDPOINTS = {"static"}
+
+
+def seed_dataset(listings: int, events: int, comments_per_item: int = 2) -> dict:
+    """Bulk-insert a dataset and return the ids the endpoint cases refer to."""
+    password_hash = bcrypt.generate_password_hash("Password123!").decode("utf-8")
+    owners = max(listings // 20, 3)
+    now = datetime.utcnow()
+
+    def insert(table, rows):
+        for start in range(0, len(rows), SEED_CHUNK_SIZE):
+            db.session.execute(table.insert(), rows[start:start + SEED_CHUNK_SIZE])
+
+    first_user = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    insert(User.__table__, [
+        {
+            "full_name": f"Guard User {i}",
+            "email": f"guard-{first_user + i}@example.com",
+            "password_hash": password_hash,
+            "role": "helper" if i == 0 else "student",
+            "created_at": now,
+        }
+        for i in range(owners)
+    ])
+    user_ids = range(first_user, first_user + owners)
+
+    first_listing = (db.session.query(db.func.max(Listing.id)).scalar() or 0) + 1
+    insert(Listing.__table__, [
+        {
+            "title": f"Room {i}",
+            "description": f"Furnished room number {i} close to transit",
+            "price": 300 + (i * 37) % 2000,
+            "location": f"Area {i % 40}",
+            "contact": "guard@example.com",
+            "photos": [],
+            "verified": i % 3 != 0,
+            "owner_id": user_ids[i % owners],
+            "created_at": now - timedelta(minutes=i),
+        }
+        for i in range(listings)
+    ])
+
+    first_event = (db.session.query(db.func.max(Event.id)).scalar() or 0) + 1
+    insert(Event.__table__, [
+        {
+            "title": f"Meetup {i}",
+            "description": "Community meetup",
+            "start_time": now + timedelta(hours=i),
+            "location": "Community Centre",
+            "created_by_id": user_ids[i % owners],
+            "created_at": now,
+        }
+        for i in range(events)
+    ])
+
+    insert(Comment.__table__, [
+        {
+            "content": "Is this still available?",
+            "user_id": user_ids[i % owners],
+            "listing_id": first_listing + i // comments_per_item if i % 2 == 0 else None,
+            "event_id": first_event + (i // comments_per_item) % max(events, 1) if i % 2 else None,
+            "created_at": now,
+        }
+        for i in range(listings * comments_per_item)
+    ])
+
+    # Searches by every student but the helper, spread over the seeded areas and prices
+    first_search = (db.session.query(db.func.max(SavedSearch.id)).scalar() or 0) + 1
+    searches = max(listings // 10, 10)
+    insert(SavedSearch.__table__, [
+        {
+            "min_price": 200 + (i * 53) % 1500,
+            "max_price": 600 + (i * 53) % 1500,
+            "location_terms": [f"area {i % 40}"],
+            "verified_only": i % 4 == 0,
+            "user_id": user_ids[1 + i % (owners - 1)],
+            "created_at": now,
+        }
+        for i in range(searches)
+    ])
+    insert(SavedSearchMatch.__table__, [
+        {
+            "user_id": user_ids[1],
+            "saved_search_id": first_search,
+            "listing_id": first_listing + i,
+            "created_at": now,
+        }
+        for i in range(min(listings, 50))
+    ])
+    db.session.merge(SavedSearchIndexVersion(id=1))
+    db.session.commit()
+
+    return {
+        "helper_id": user_ids[0],
+        "student_id": user_ids[1],
+        "student_email": f"guard-{user_ids[1]}@example.com",
+        "listing_id": first_listing,
+        "unverified_listing_id": first_listing,
+        # Every third seeded listing is unverified
+        "unverified_batch_ids": [first_listing + 3 * i for i in range(1, 11)],
+        "deletable_listing_id": first_listing + 1,
+        "event_id": first_event,
+        "spam_user_id": user_ids[2],
+        # Owned by student_id, whose inbox holds the seeded matches
+        "saved_search_id": first_search,
+        "listing_total": db.session.query(Listing).count(),
+        "event_total": db.session.query(Event).count(),
+    }
+
+
+def prepare_dataset(listings: int, events: int) -> dict:
+    """Seed the dataset and build the derived tables and index the endpoints read from."""
+    ids = seed_dataset(listings, events)
+    listing_stats.rebuild()
+    dedup.dedup_existing()
+    similarity.build()
+    saved_searches.load()
+    if db.engine.dialect.name == "postgresql":
+        # Refresh planner statistics so plans reflect the seeded volume
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+    return ids
+
+
+def endpoint_cases(ids: dict) -> dict:
+    """The request each endpoint is driven with, and how many statements it may issue.
+
+    ``allow_scans`` names small tables a route may scan on purpose.
+    ``status`` is the expected response code when it is not a 2xx.
+    """
+    start_time = (datetime.utcnow() + timedelta(days=3)).replace(microsecond=0).isoformat()
+    # selectinload fetches related rows in batches of 500 parent ids
+    listing_batches = math.ceil(ids["listing_total"] / 500)
+    event_batches = math.ceil(ids["event_total"] / 500)
+    return {
+        "health": {"method": "GET", "path": "/health", "budget": 0},
+        # A missing file: the route never touches the database
+        "serve_upload": {"method": "GET", "path": "/uploads/guard-missing.png", "budget": 0, "status": 404},
+        "auth.register": {
+            "method": "POST",
+            "path": "/api/auth/register",
+            "json": {"full_name": "Guard", "email": "guard-new@example.com", "password": "Password123!"},
+            "budget": 3,
+        },
+        "auth.login": {
+            "method": "POST",
+            "path": "/api/auth/login",
+            "json": {"email": ids["student_email"], "password": "Password123!"},
+            "budget": 1,
+        },
+        "listings.list_listings": {"method": "GET", "path": "/api/listings/", "budget": 1 + listing_batches},
+        "listings.listing_price_stats": {
+            "method": "GET",
+            "path": "/api/listings/stats",
+            "budget": 1,
+            "allow_scans": {"listing_price_buckets"},
+        },
+        "listings.get_listing": {"method": "GET", "path": f"/api/listings/{ids['listing_id']}", "budget": 2},
+        "listings.similar_listings": {
+            "method": "GET",
+            "path": f"/api/listings/{ids['listing_id']}/similar",
+            "budget": 3,
+        },
+        "listings.create_listing": {
+            "method": "POST",
+            "path": "/api/listings/",
+            "json": {
+                "title": "Guard listing",
+                "description": "Sunny basement room near the riverfront trail",
+                "price": 725,
+                "location": "Area 1",
+                "contact": "guard@example.com",
+                "owner_id": ids["student_id"],
+            },
+            "budget": 12,
+        },
+        "listings.verify_listing": {
+            "method": "PATCH",
+            "path": f"/api/listings/{ids['unverified_listing_id']}/verify",
+            "json": {"helper_id": ids["helper_id"]},
+            "budget": 10,
+        },
+        "listings.verification_queue_batch": {
+            "method": "GET",
+            "path": f"/api/listings/verification-queue?helper_id={ids['helper_id']}&limit=10",
+            "budget": 3,
+        },
+        "listings.verify_listings": {
+            "method": "PATCH",
+            "path": "/api/listings/verify",
+            "json": {"helper_id": ids["helper_id"], "listing_ids": ids["unverified_batch_ids"]},
+            "budget": 7,
+        },
+        # Rejected before anything is written to disk; the route runs no SQL
+        "listings.upload_photo": {"method": "POST", "path": "/api/listings/upload-photo", "budget": 0, "status": 400},
+        "events.list_events": {"method": "GET", "path": "/api/events/", "budget": 1 + event_batches},
+        "events.get_event": {"method": "GET", "path": f"/api/events/{ids['event_id']}", "budget": 2},
+        "events.create_event": {
+            "method": "POST",
+            "path": "/api/events/",
+            "json": {
+                "title": "Guard meetup",
+                "description": "Query plan review",
+                "start_time": start_time,
+                "location": "Library",
+                "created_by_id": ids["helper_id"],
+            },
+            "budget": 5,
+        },
+        "batch.run_batch": {
+            "method": "POST",
+            "path": "/api/batch",
+            "json": {
+                "requests": [
+                    {"id": "stats", "method": "GET", "path": "/api/listings/stats"},
+                    {"id": "events", "method": "GET", "path": "/api/events/"},
+                ]
+            },
+            "budget": 2 + event_batches,
+            "allow_scans": {"listing_price_buckets"},
+        },
+        "listings.delete_listing": {
+            "method": "DELETE",
+            "path": f"/api/listings/{ids['deletable_listing_id']}",
+            "json": {"user_id": ids["helper_id"]},
+            "budget": 5,
+        },
+        # After the listing cases: adding a search makes the next listing rebuild the predicate index
+        "saved_searches.list_saved_searches": {
+            "method": "GET",
+            "path": f"/api/saved-searches/?user_id={ids['student_id']}",
+            "budget": 1,
+        },
+        "saved_searches.create_saved_search": {
+            "method": "POST",
+            "path": "/api/saved-searches/",
+            "json": {
+                "user_id": ids["student_id"],
+                "min_price": 400,
+                "max_price": 900,
+                "location_terms": ["Area 7"],
+                "verified_only": True,
+            },
+            "budget": 5,
+        },
+        "saved_searches.saved_search_inbox": {
+            "method": "GET",
+            "path": f"/api/saved-searches/inbox?user_id={ids['student_id']}&limit=20",
+            "budget": 1,
+        },
+        "saved_searches.delete_saved_search": {
+            "method": "DELETE",
+            "path": f"/api/saved-searches/{ids['saved_search_id']}",
+            "json": {"user_id": ids["student_id"]},
+            "budget": 2,
+        },
+        "events.delete_event": {
+            "method": "DELETE",
+            "path": f"/api/events/{ids['event_id']}",
+            "json": {"user_id": ids["helper_id"]},
+            "budget": 3,
+        },
+        # Deletes a whole account graph through ON DELETE CASCADE; independent of how much it owns
+        "admin.bulk_remove_users": {
+            "method": "DELETE",
+            "path": "/api/admin/users",
+            "json": {"helper_id": ids["helper_id"], "user_ids": [ids["spam_user_id"]]},
+            "budget": 8,
+        },
+    }
+
+
+@contextmanager
+def capture_statements(engine):
+    """Collect (statement, parameters, executemany) for every execution on ``engine``."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters, executemany))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def sqlite_scanned_table(detail: str) -> str | None:
+    """Table a SQLite plan line scans without an index.
+
+    SQLite 3.36 and later print ``SCAN listings``, older builds ``SCAN TABLE listings``.
+    """
+    words = detail.split()
+    if words[:1] != ["SCAN"] or "USING" in words:
+        return None
+    if words[1:2] == ["TABLE"]:
+        words = words[1:]
+    return words[1] if len(words) > 1 else None
+
+
+def explain_problems(connection, statement: str, parameters, allow_scans=()) -> list[str]:
+    """Un-indexed table scans in the plan of one statement."""
+    if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+        return []
+    tables = set(db.metadata.tables) - set(allow_scans)
+    if connection.dialect.name == "sqlite":
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [row[-1] for row in plan if sqlite_scanned_table(row[-1]) in tables]
+    if connection.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        problems = []
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in tables:
+                problems.append(f"Seq Scan on {node['Relation Name']}")
+            nodes.extend(node.get("Plans", []))
+        return problems
+    return []
+
+
+def run_guard(app: Flask, ids: dict) -> list[dict]:
+    """Drive every registered route once and return one result per endpoint."""
+    cases = endpoint_cases(ids)
+    client = app.test_client()
+    results = []
+    registered = {rule.endpoint: rule for rule in app.url_map.iter_rules() if rule.endpoint not in SKIPPED_ENDPOINTS}
+
+    for endpoint in [name for name in cases if name in registered] + sorted(set(registered) - set(cases)):
+        rule = registered[endpoint]
+        case = cases.get(endpoint)
+        if case is None:
+            results.append({
+                "endpoint": endpoint,
+                "request": f"{','.join(sorted(rule.methods - {'HEAD', 'OPTIONS'}))} {rule.rule}",
+                "problems": ["no guard case registered in backend/query_guard.py"],
+                "statements": 0,
+                "budget": None,
+            })
+            continue
+
+        with app.app_context():
+            engine = db.engine
+            with capture_statements(engine) as statements:
+                response = client.open(case["path"], method=case["method"], json=case.get("json"))
+
+            problems = []
+            expected = case.get("status")
+            if (expected is None and not 200 <= response.status_code < 300) or (
+                expected is not None and response.status_code != expected
+            ):
+                problems.append(f"unexpected status {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            if len(statements) > case["budget"]:
+                problems.append(f"{len(statements)} statements exceed the budget of {case['budget']}")
+            with engine.connect() as connection:
+                for statement, parameters, executemany in statements:
+                    if executemany:
+                        continue
+                    for problem in explain_problems(connection, statement, parameters, case.get("allow_scans", ())):
+                        problems.append(f"{problem} in: {' '.join(statement.split())[:160]}")
+
+        results.append({
+            "endpoint": endpoint,
+            "request": f"{case['method']} {case['path']}",
+            "problems": problems,
+            "statements": len(statements),
+            "budget": case["budget"],
+        })
+    return results
+
+
+def format_report(results: list[dict]) -> str:
+    failed = [result for result in results if result["problems"]]
+    lines = [f"Query plan guard: {len(results)} endpoints, {len(failed)} failing", ""]
+    for result in results:
+        status = "FAIL" if result["problems"] else "ok  "
+        budget = "-" if result["budget"] is None else result["budget"]
+        lines.append(
+            f"{status} {result['request']:<48} {result['statements']:>3}/{budget} statements  ({result['endpoint']})"
+        )
+        lines.extend(f"       - {problem}" for problem in result["problems"])
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    from .app import create_app
+
+    parser = argparse.ArgumentParser(description="Check API endpoints for table scans and statement budgets.")
+    parser.add_argument("--listings", type=int, default=20_000)
+    parser.add_argument("--events", type=int, default=2_000)
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv("QUERY_GUARD_DATABASE_URL"),
+        help="Scratch database to seed (default: a temporary SQLite file). Never point this at production.",
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        database_url = args.database_url or f"sqlite:///{os.path.join(scratch, 'guard.db')}"
+        config = type(
+            "QueryGuardConfig",
+            (Config,),
+            {"SQLALCHEMY_DATABASE_URI": database_url, "SIMILAR_LISTINGS_INDEX_DIR": scratch},
+        )
+        app = create_app(config)
+        with app.app_context():
+            ids = prepare_dataset(args.listings, args.events)
+        results = run_guard(app, ids)
+
+    print(format_report(results))
+    return 1 if any(result["problems"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,16 @@
+from .admin import admin_bp
 from .auth import auth_bp
+from .batch import batch_bp
 from .events import events_bp
 from .listings import listings_bp
+from .saved_searches import saved_searches_bp
 
 
 def register_blueprints(app):
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(listings_bp, url_prefix="/api/listings")
     app.register_blueprint(events_bp, url_prefix="/api/events")
+    app.register_blueprint(batch_bp, url_prefix="/api/batch")
+    app.register_blueprint(admin_bp, url_prefix="/api/admin")
+    app.register_blueprint(saved_searches_bp, url_prefix="/api/saved-searches")
 
@@ -0,0 +1,38 @@
+from http import HTTPStatus
+
+from flask import Blueprint, jsonify, request
+
+from ..database import db
+from ..models import User
+from ..spam_cleanup import remove_users
+
+admin_bp = Blueprint("admin", __name__)
+
+
+@admin_bp.delete("/users")
+def bulk_remove_users():
+    """Remove spam accounts with all their listings, events and comments. Helpers only."""
+    payload = request.get_json() or {}
+    helper_id = payload.get("helper_id")
+    user_ids = payload.get("user_ids")
+
+    if not helper_id:
+        return jsonify({"error": "helper_id is required"}), HTTPStatus.BAD_REQUEST
+    if not isinstance(user_ids, list) or not user_ids or not all(isinstance(user_id, int) for user_id in user_ids):
+        return jsonify({"error": "user_ids must be a non-empty list of ids"}), HTTPStatus.BAD_REQUEST
+
+    helper = db.session.get(User, helper_id)
+    if not helper:
+        return jsonify({"error": "Helper not found"}), HTTPStatus.NOT_FOUND
+    if helper.role == "student":
+        return jsonify({"error": "Only helpers can remove accounts"}), HTTPStatus.FORBIDDEN
+
+    targets = db.session.execute(db.select(User.id, User.role).where(User.id.in_(user_ids))).all()
+    missing = sorted(set(user_ids) - {row.id for row in targets})
+    if missing:
+        return jsonify({"error": f"Users not found: {', '.join(map(str, missing))}"}), HTTPStatus.NOT_FOUND
+    if any(row.role != "student" for row in targets):
+        return jsonify({"error": "Only student accounts can be bulk removed"}), HTTPStatus.FORBIDDEN
+
+    removed = remove_users(sorted(set(user_ids)))
+    return jsonify({"removed": removed}), HTTPStatus.OK
@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy.pool import StaticPool
+from werkzeug.exceptions import HTTPException
+
+from ..database import db
+
+batch_bp = Blueprint("batch", __name__)
+
+ALLOWED_METHODS = {"GET", "POST", "PATCH", "DELETE"}
+# GET routes that never write, and so may run concurrently with each other. Some GETs do write:
+# the verification queue claims and leases listings, so two claims must not race inside one batch.
+READ_ONLY_ENDPOINTS = {
+    "listings.list_listings",
+    "listings.listing_price_stats",
+    "listings.get_listing",
+    "listings.similar_listings",
+    "events.list_events",
+    "events.get_event",
+    "saved_searches.list_saved_searches",
+    "saved_searches.saved_search_inbox",
+}
+
+
+def _run_item(app, item):
+    """Dispatch one sub-request through the app's routing, error handling and hooks."""
+    with app.test_request_context(item["path"], method=item["method"], json=item.get("body")):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:  # noqa: BLE001 - one failing item must not fail the batch
+            db.session.rollback()
+            current_app.logger.exception("Batch item %s failed", item["path"])
+            return {"status": int(HTTPStatus.INTERNAL_SERVER_ERROR), "body": {"error": "Internal server error"}}
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True)
+        return {"status": response.status_code, "body": body}
+
+
+def _run_concurrently(app, items):
+    """Run read-only items on worker threads; each thread gets its own app context and session."""
+    def run(item):
+        with app.app_context():
+            return _run_item(app, item)
+
+    with ThreadPoolExecutor(max_workers=min(len(items), app.config["BATCH_MAX_WORKERS"])) as pool:
+        return list(pool.map(run, items))
+
+
+def _read_only(app, item) -> bool:
+    if item["method"] != "GET":
+        return False
+    try:
+        endpoint, _ = app.url_map.bind("localhost").match(item["path"].split("?", 1)[0], method="GET")
+    except HTTPException:
+        return False
+    return endpoint in READ_ONLY_ENDPOINTS
+
+
+def _validate(items):
+    if not isinstance(items, list) or not items:
+        return "requests must be a non-empty list"
+    if len(items) > current_app.config["BATCH_MAX_REQUESTS"]:
+        return f"A batch may contain at most {current_app.config['BATCH_MAX_REQUESTS']} requests"
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            return f"requests[{position}] must be an object"
+        item["method"] = str(item.get("method", "GET")).upper()
+        path = item.get("path")
+        if item["method"] not in ALLOWED_METHODS:
+            return f"requests[{position}]: method must be one of {', '.join(sorted(ALLOWED_METHODS))}"
+        if not isinstance(path, str) or not path.startswith("/api/"):
+            return f"requests[{position}]: path must be an /api/ route other than /api/batch"
+        if path.split("?", 1)[0].rstrip("/") == "/api/batch":
+            return f"requests[{position}]: path must be an /api/ route other than /api/batch"
+    return None
+
+
+@batch_bp.post("")
+def run_batch():
+    """Execute several API calls in one round trip.
+
+    Items run in order on the request's own database session. With ``parallel``
+    set, each run of consecutive read-only GET items (``READ_ONLY_ENDPOINTS``) is
+    executed concurrently on worker threads instead.
+    """
+    payload = request.get_json() or {}
+    items = payload.get("requests")
+    error = _validate(items)
+    if error:
+        return jsonify({"error": error}), HTTPStatus.BAD_REQUEST
+
+    app = current_app._get_current_object()
+    # A single shared connection (in-memory SQLite) cannot serve several threads
+    parallel = (
+        bool(payload.get("parallel"))
+        and app.config["BATCH_MAX_WORKERS"] > 1
+        and not isinstance(db.engine.pool, StaticPool)
+    )
+
+    read_only = [_read_only(app, item) for item in items]
+    results = []
+    position = 0
+    while position < len(items):
+        if parallel and read_only[position]:
+            end = position
+            while end < len(items) and read_only[end]:
+                end += 1
+            if end - position > 1:
+                results.extend(_run_concurrently(app, items[position:end]))
+                position = end
+                continue
+        results.append(_run_item(app, items[position]))
+        position += 1
+
+    responses = [{"id": item.get("id", index), **result} for index, (item, result) in enumerate(zip(items, results))]
+    return jsonify({"responses": responses}), HTTPStatus.OK
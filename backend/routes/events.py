@@ -2,22 +2,66 @@ from datetime import datetime, timezone
 from http import HTTPStatus
 
 from flask import Blueprint, jsonify, request
+from sqlalchemy import select
+from sqlalchemy.orm import aliased, joinedload, selectinload
 
+from ..cache import detail_cache, detail_response
 from ..database import db
-from ..models import Event, User
-from ..schemas import EventSchema
+from ..models import Comment, Event, User
+from ..schemas import CommentSchema, EventSchema
 
 events_bp = Blueprint("events", __name__)
 event_schema = EventSchema()
 event_list_schema = EventSchema(many=True)
+event_detail_schema = EventSchema(exclude=("comments",))
+recent_comment_schema = CommentSchema(many=True, only=("id", "content", "created_at", "author"))
+
+RECENT_COMMENTS = 10
 
 
 @events_bp.get("/")
 def list_events():
-    events = Event.query.order_by(Event.start_time.asc()).all()
+    events = (
+        Event.query.options(joinedload(Event.creator), selectinload(Event.comments))
+        .order_by(Event.start_time.asc())
+        .all()
+    )
     return jsonify(event_list_schema.dump(events)), HTTPStatus.OK
 
 
+@events_bp.get("/<int:event_id>")
+def get_event(event_id):
+    """One event with its creator and most recent comments, cached per version"""
+    version = db.session.execute(select(Event.version).where(Event.id == event_id)).scalar()
+    if version is None:
+        detail_cache.discard("event", event_id)
+        return jsonify({"error": "Event not found"}), HTTPStatus.NOT_FOUND
+
+    def build():
+        # Event, creator and the latest comments with their authors in one statement
+        recent = (
+            select(Comment)
+            .where(Comment.event_id == event_id)
+            .order_by(Comment.created_at.desc(), Comment.id.desc())
+            .limit(RECENT_COMMENTS)
+            .subquery()
+        )
+        comment = aliased(Comment, recent)
+        author = aliased(User)
+        rows = db.session.execute(
+            select(Event, comment, author)
+            .options(joinedload(Event.creator))
+            .outerjoin(comment, comment.event_id == Event.id)
+            .outerjoin(author, author.id == comment.user_id)
+            .where(Event.id == event_id)
+            .order_by(comment.created_at.desc(), comment.id.desc())
+        ).all()
+        comments = [row_comment for _, row_comment, _ in rows if row_comment is not None]
+        return {**event_detail_schema.dump(rows[0][0]), "recent_comments": recent_comment_schema.dump(comments)}
+
+    return detail_response("event", event_id, version, build)
+
+
 @events_bp.post("/")
 def create_event():
     payload = request.get_json() or {}
@@ -89,5 +133,6 @@ def delete_event(event_id):
     
     db.session.delete(event)
     db.session.commit()
+    detail_cache.discard("event", event_id)
     
     return jsonify({"message": "Event deleted successfully"}), HTTPStatus.OK
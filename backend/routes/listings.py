@@ -1,24 +1,140 @@
-import os
 from http import HTTPStatus
 from werkzeug.utils import secure_filename
 
 from flask import Blueprint, jsonify, request, current_app
+from sqlalchemy import select, update
+from sqlalchemy.orm import aliased, joinedload, selectinload
 
+from .. import dedup, listing_stats, saved_searches, similarity, upload_store, verification_queue
+from ..cache import detail_cache, detail_response
 from ..database import db
-from ..models import Listing, User
-from ..schemas import ListingSchema
+from ..models import Comment, Listing, User, new_version
+from ..schemas import CommentSchema, ListingSchema
 
 listings_bp = Blueprint("listings", __name__)
 listing_schema = ListingSchema()
 listing_list_schema = ListingSchema(many=True)
+listing_detail_schema = ListingSchema(exclude=("comments",))
+queue_schema = ListingSchema(many=True, exclude=("comments",))
+recent_comment_schema = CommentSchema(many=True, only=("id", "content", "created_at", "author"))
+
+RECENT_COMMENTS = 10
 
 
 @listings_bp.get("/")
 def list_listings():
-    listings = Listing.query.order_by(Listing.created_at.desc()).all()
+    listings = (
+        Listing.query.options(
+            joinedload(Listing.owner),
+            joinedload(Listing.verified_by),
+            selectinload(Listing.comments),
+        )
+        .order_by(Listing.created_at.desc())
+        .all()
+    )
     return jsonify(listing_list_schema.dump(listings)), HTTPStatus.OK
 
 
+@listings_bp.get("/stats")
+def listing_price_stats():
+    """Price statistics per location/verified group, served from the materialized buckets"""
+    location = request.args.get("location")
+    verified = request.args.get("verified")
+    if verified is not None:
+        if verified.lower() not in ("true", "false"):
+            return jsonify({"error": "verified must be true or false"}), HTTPStatus.BAD_REQUEST
+        verified = verified.lower() == "true"
+
+    return jsonify(listing_stats.collect(location=location, verified=verified)), HTTPStatus.OK
+
+
+@listings_bp.get("/<int:listing_id>")
+def get_listing(listing_id):
+    """One listing with its owner and most recent comments, cached per version"""
+    version = db.session.execute(select(Listing.version).where(Listing.id == listing_id)).scalar()
+    if version is None:
+        detail_cache.discard("listing", listing_id)
+        return jsonify({"error": "Listing not found"}), HTTPStatus.NOT_FOUND
+
+    def build():
+        # Listing, owner, verifier and the latest comments with their authors in one statement
+        recent = (
+            select(Comment)
+            .where(Comment.listing_id == listing_id)
+            .order_by(Comment.created_at.desc(), Comment.id.desc())
+            .limit(RECENT_COMMENTS)
+            .subquery()
+        )
+        comment = aliased(Comment, recent)
+        author = aliased(User)
+        rows = db.session.execute(
+            select(Listing, comment, author)
+            .options(joinedload(Listing.owner), joinedload(Listing.verified_by))
+            .outerjoin(comment, comment.listing_id == Listing.id)
+            .outerjoin(author, author.id == comment.user_id)
+            .where(Listing.id == listing_id)
+            .order_by(comment.created_at.desc(), comment.id.desc())
+        ).all()
+        comments = [row_comment for _, row_comment, _ in rows if row_comment is not None]
+        return {**listing_detail_schema.dump(rows[0][0]), "recent_comments": recent_comment_schema.dump(comments)}
+
+    return detail_response("listing", listing_id, version, build)
+
+
+@listings_bp.get("/verification-queue")
+def verification_queue_batch():
+    """Claim a batch of the oldest unverified listings for one helper (``?helper_id=&limit=``)"""
+    helper_id = request.args.get("helper_id", type=int)
+    if not helper_id:
+        return jsonify({"error": "helper_id is required"}), HTTPStatus.BAD_REQUEST
+
+    limit = request.args.get("limit", 10, type=int)
+    max_batch = current_app.config["VERIFICATION_QUEUE_MAX_BATCH"]
+    if not 1 <= limit <= max_batch:
+        return jsonify({"error": f"limit must be between 1 and {max_batch}"}), HTTPStatus.BAD_REQUEST
+
+    helper = db.session.get(User, helper_id)
+    if not helper:
+        return jsonify({"error": "Helper not found"}), HTTPStatus.NOT_FOUND
+    if helper.role == "student":
+        return jsonify({"error": "Only helpers can verify listings"}), HTTPStatus.FORBIDDEN
+
+    claimed = verification_queue.claim(helper_id, limit)
+    listings = (
+        Listing.query.options(joinedload(Listing.owner))
+        .filter(Listing.id.in_(claimed))
+        .order_by(Listing.id)
+        .all()
+    ) if claimed else []
+    return jsonify(queue_schema.dump(listings)), HTTPStatus.OK
+
+
+@listings_bp.get("/<int:listing_id>/similar")
+def similar_listings(listing_id):
+    """Most similar listings by text, location and price, from the precomputed vector index"""
+    listing = db.session.get(Listing, listing_id)
+    if not listing:
+        return jsonify({"error": "Listing not found"}), HTTPStatus.NOT_FOUND
+
+    limit = request.args.get("limit", 5, type=int)
+    if not 1 <= limit <= 50:
+        return jsonify({"error": "limit must be between 1 and 50"}), HTTPStatus.BAD_REQUEST
+
+    matches = similarity.similar_to(listing, limit)
+    if matches is None:
+        return jsonify({"error": "Similar listings index has not been built"}), HTTPStatus.SERVICE_UNAVAILABLE
+
+    rows = Listing.query.options(
+        joinedload(Listing.owner), joinedload(Listing.verified_by), selectinload(Listing.comments)
+    ).filter(Listing.id.in_([match_id for match_id, _ in matches]))
+    found = {row.id: row for row in rows}
+    results = []
+    for match_id, score in matches:
+        if match_id in found:
+            results.append({**listing_schema.dump(found[match_id]), "similarity": round(score, 4)})
+    return jsonify(results), HTTPStatus.OK
+
+
 @listings_bp.post("/")
 def create_listing():
     payload = request.get_json() or {}
@@ -47,6 +163,19 @@ def create_listing():
     if not isinstance(photos, list):
         photos = [photos] if photos else []
 
+    # Near-duplicate check against the LSH band index before anything is written
+    signature = None
+    duplicate = None
+    dedup_action = current_app.config["LISTING_DEDUP_ACTION"]
+    if dedup_action != "off":
+        signature = dedup.signature_for_listing(required_fields["description"], photos)
+        duplicate = dedup.find_duplicate(signature)
+        if duplicate and dedup_action == "reject":
+            return (
+                jsonify({"error": "A very similar listing already exists", "duplicate_of_id": duplicate[0]}),
+                HTTPStatus.CONFLICT,
+            )
+
     listing = Listing(
         title=required_fields["title"],
         description=required_fields["description"],
@@ -55,11 +184,17 @@ def create_listing():
         contact=required_fields["contact"],
         photos=photos,
         verified=bool(payload.get("verified", False)),
+        duplicate_of_id=duplicate[0] if duplicate else None,
         owner=owner,
     )
+    dedup.index_listing(listing, signature)
 
     db.session.add(listing)
+    listing_stats.record_listing(listing)
+    upload_store.touch(photos)
+    saved_searches.queue_new_listing(listing)
     db.session.commit()
+    similarity.add_listing(listing)
 
     return jsonify(listing_schema.dump(listing)), HTTPStatus.CREATED
 
@@ -85,13 +220,48 @@ def verify_listing(listing_id):
     if not listing:
         return jsonify({"error": "Listing not found"}), HTTPStatus.NOT_FOUND
     
-    listing.verified = True
-    listing.verified_by_id = helper_id
-    db.session.commit()
+    # The guarded UPDATE ... WHERE verified = false lets only one of two concurrent helpers
+    # move the price bucket and queue saved-search matches
+    verification_queue.verify_many(helper_id, [listing_id])
     
     return jsonify(listing_schema.dump(listing)), HTTPStatus.OK
 
 
+@listings_bp.patch("/verify")
+def verify_listings():
+    """Verify many listings in one transaction, e.g. a claimed verification-queue batch"""
+    payload = request.get_json() or {}
+    helper_id = payload.get("helper_id")
+    listing_ids = payload.get("listing_ids")
+
+    if not helper_id:
+        return jsonify({"error": "helper_id is required"}), HTTPStatus.BAD_REQUEST
+    max_batch = current_app.config["VERIFICATION_QUEUE_MAX_BATCH"]
+    if (
+        not isinstance(listing_ids, list)
+        or not 1 <= len(listing_ids) <= max_batch
+        or not all(isinstance(listing_id, int) for listing_id in listing_ids)
+    ):
+        return (
+            jsonify({"error": f"listing_ids must be a list of 1 to {max_batch} ids"}),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    helper = db.session.get(User, helper_id)
+    if not helper:
+        return jsonify({"error": "Helper not found"}), HTTPStatus.NOT_FOUND
+    if helper.role == "student":
+        return jsonify({"error": "Only helpers can verify listings"}), HTTPStatus.FORBIDDEN
+
+    existing = set(db.session.execute(select(Listing.id).where(Listing.id.in_(listing_ids))).scalars())
+    verified = verification_queue.verify_many(helper_id, sorted(existing))
+    return jsonify({
+        "verified": verified,
+        "already_verified": sorted(existing - set(verified)),
+        "not_found": sorted(set(listing_ids) - existing),
+    }), HTTPStatus.OK
+
+
 @listings_bp.delete("/<int:listing_id>")
 def delete_listing(listing_id):
     """Delete a listing. Only the owner or a helper can delete."""
@@ -113,8 +283,16 @@ def delete_listing(listing_id):
     if listing.owner_id != user_id and user.role == "student":
         return jsonify({"error": "You can only delete your own listings"}), HTTPStatus.FORBIDDEN
     
+    listing_stats.forget_listing(listing)
+    # ON DELETE SET NULL clears duplicate_of_id on copies; their cached detail payloads must not outlive it
+    db.session.execute(
+        update(Listing).where(Listing.duplicate_of_id == listing_id).values(version=new_version()),
+        execution_options={"synchronize_session": False},
+    )
     db.session.delete(listing)
     db.session.commit()
+    similarity.remove_listing(listing_id)
+    detail_cache.discard("listing", listing_id)
     
     return jsonify({"message": "Listing deleted successfully"}), HTTPStatus.OK
 
@@ -135,19 +313,8 @@ def upload_photo():
     if not ("." in filename and filename.rsplit(".", 1)[1].lower() in allowed_extensions):
         return jsonify({"error": "Invalid file type. Allowed: png, jpg, jpeg, gif, webp"}), HTTPStatus.BAD_REQUEST
     
-    # Create uploads directory if it doesn't exist
-    upload_dir = os.path.join(current_app.root_path, "uploads")
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Save with unique name
-    from datetime import datetime
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_filename = f"{timestamp}_{filename}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    file.save(file_path)
-    
-    # Return relative URL - frontend will construct full URL
-    # The schema will convert it to absolute URL when returning listings
-    photo_url = f"/uploads/{unique_filename}"
+    # Stored under a random sharded name; the schema converts it to an absolute URL when returning listings
+    photo_url = upload_store.save_upload(file, filename)
+    db.session.commit()
     return jsonify({"url": photo_url}), HTTPStatus.CREATED
 
@@ -0,0 +1,126 @@
+from http import HTTPStatus
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+from .. import saved_searches
+from ..database import db
+from ..models import Listing, SavedSearch, SavedSearchMatch, User
+from ..schemas import SavedSearchMatchSchema, SavedSearchSchema
+
+saved_searches_bp = Blueprint("saved_searches", __name__)
+saved_search_schema = SavedSearchSchema()
+saved_search_list_schema = SavedSearchSchema(many=True)
+match_list_schema = SavedSearchMatchSchema(many=True, exclude=("user_id",))
+
+INBOX_MAX_PAGE = 100
+
+
+def _price(payload, name):
+    value = payload.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    return float(value)
+
+
+@saved_searches_bp.get("/")
+def list_saved_searches():
+    user_id = request.args.get("user_id", type=int)
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), HTTPStatus.BAD_REQUEST
+
+    searches = SavedSearch.query.filter_by(user_id=user_id).order_by(SavedSearch.id).all()
+    return jsonify(saved_search_list_schema.dump(searches)), HTTPStatus.OK
+
+
+@saved_searches_bp.post("/")
+def create_saved_search():
+    """Save a price range / location terms / verified-only search; matching new listings go to the inbox"""
+    payload = request.get_json() or {}
+    user_id = payload.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), HTTPStatus.BAD_REQUEST
+
+    try:
+        min_price = _price(payload, "min_price")
+        max_price = _price(payload, "max_price")
+    except ValueError as error:
+        return jsonify({"error": str(error)}), HTTPStatus.BAD_REQUEST
+    if min_price is not None and max_price is not None and min_price > max_price:
+        return jsonify({"error": "min_price must not exceed max_price"}), HTTPStatus.BAD_REQUEST
+
+    terms = payload.get("location_terms", [])
+    if isinstance(terms, str):
+        terms = [terms]
+    if not isinstance(terms, list) or not all(isinstance(term, str) for term in terms):
+        return jsonify({"error": "location_terms must be a list of strings"}), HTTPStatus.BAD_REQUEST
+
+    user = db.session.get(User, user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), HTTPStatus.NOT_FOUND
+
+    limit = current_app.config["SAVED_SEARCH_MAX_PER_USER"]
+    saved = db.session.execute(select(func.count(SavedSearch.id)).where(SavedSearch.user_id == user_id)).scalar()
+    if saved >= limit:
+        return jsonify({"error": f"A user can keep at most {limit} saved searches"}), HTTPStatus.CONFLICT
+
+    search = SavedSearch(
+        name=payload.get("name"),
+        min_price=min_price,
+        max_price=max_price,
+        location_terms=saved_searches.normalize_terms(terms),
+        verified_only=bool(payload.get("verified_only", False)),
+        user_id=user_id,
+    )
+    db.session.add(search)
+    saved_searches.bump_version()
+    db.session.commit()
+
+    return jsonify(saved_search_schema.dump(search)), HTTPStatus.CREATED
+
+
+@saved_searches_bp.delete("/<int:search_id>")
+def delete_saved_search(search_id):
+    """Delete a saved search and its inbox entries. Only its owner can delete it."""
+    payload = request.get_json() or {}
+    user_id = payload.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), HTTPStatus.BAD_REQUEST
+
+    search = db.session.get(SavedSearch, search_id)
+    if not search:
+        return jsonify({"error": "Saved search not found"}), HTTPStatus.NOT_FOUND
+    if search.user_id != user_id:
+        return jsonify({"error": "You can only delete your own saved searches"}), HTTPStatus.FORBIDDEN
+
+    db.session.delete(search)
+    db.session.commit()
+    return jsonify({"message": "Saved search deleted successfully"}), HTTPStatus.OK
+
+
+@saved_searches_bp.get("/inbox")
+def saved_search_inbox():
+    """Listings matched by the user's saved searches, oldest first after the ``after`` cursor"""
+    user_id = request.args.get("user_id", type=int)
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), HTTPStatus.BAD_REQUEST
+
+    after = request.args.get("after", 0, type=int)
+    limit = request.args.get("limit", 20, type=int)
+    if not 1 <= limit <= INBOX_MAX_PAGE:
+        return jsonify({"error": f"limit must be between 1 and {INBOX_MAX_PAGE}"}), HTTPStatus.BAD_REQUEST
+
+    matches = (
+        SavedSearchMatch.query.options(joinedload(SavedSearchMatch.listing).joinedload(Listing.owner))
+        .filter(SavedSearchMatch.user_id == user_id, SavedSearchMatch.id > after)
+        .order_by(SavedSearchMatch.id)
+        .limit(limit)
+        .all()
+    )
+    return jsonify({
+        "matches": match_list_schema.dump(matches),
+        "next_after": matches[-1].id if matches else after,
+    }), HTTPStatus.OK
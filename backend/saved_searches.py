@@ -0,0 +1,225 @@
+"""Saved searches and incremental matching of new listings.
+
+A saved search is a price range, a list of location terms and a verified-only
+flag. Instead of testing every saved search against each new listing, every
+worker keeps an in-memory predicate index per verified-only flag:
+
+* a centered interval tree over the ``[min_price, max_price]`` ranges; an
+  open end is infinite. A stabbing query returns the searches whose range
+  contains the listing price.
+* an inverted index from location words to terms. Each term is posted under
+  its rarest word. A listing's location words look up the candidate terms, and
+  a term matches when all of its words are in the location. Searches without
+  terms match every location.
+
+A listing matches the searches found by both lookups. ``create_listing`` matches
+against searches without the verified-only flag, plus the verified-only ones
+when the listing is already verified. ``verify_listing`` and the batched verify
+match against the verified-only searches. The matches are inserted into
+``saved_search_matches`` in the same transaction as the listing change, and
+``GET /api/saved-searches/inbox`` reads them back.
+
+Workers learn about new searches through ``saved_search_index_version``. Creating
+a search replaces the version token, and a worker whose index was built under a
+different token rebuilds it before matching. Deleting a search does not bump the
+token: the insert selects from ``saved_searches`` by id, so a deleted search
+left in the index matches nothing. Search ids are never reused.
+"""
+
+import math
+import re
+from bisect import bisect_right
+from collections import Counter
+from statistics import median
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .database import db
+from .models import SavedSearch, SavedSearchIndexVersion, SavedSearchMatch, new_version
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def location_words(text: str) -> set[str]:
+    return set(_WORD_RE.findall((text or "").lower()))
+
+
+def normalize_terms(terms) -> list[str]:
+    """Lower-case each term to space-separated words; empty and repeated terms are dropped."""
+    normalized = []
+    for term in terms:
+        words = " ".join(_WORD_RE.findall(term.lower()))
+        if words and words not in normalized:
+            normalized.append(words)
+    return normalized
+
+
+class IntervalTree:
+    """Static centered interval tree over closed ``(low, high, key)`` intervals."""
+
+    def __init__(self, intervals):
+        self.root = self._build(list(intervals))
+
+    @classmethod
+    def _build(cls, intervals):
+        if not intervals:
+            return None
+        finite = [value for low, high, _ in intervals for value in (low, high) if math.isfinite(value)]
+        center = median(finite) if finite else 0.0
+        left = [interval for interval in intervals if interval[1] < center]
+        right = [interval for interval in intervals if interval[0] > center]
+        here = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        by_low = sorted(here, key=lambda interval: interval[0])
+        by_high = sorted(here, key=lambda interval: -interval[1])
+        return {
+            "center": center,
+            # Ascending lows and descending highs, searched with bisect
+            "lows": [low for low, _, _ in by_low],
+            "low_keys": [key for _, _, key in by_low],
+            "highs": [-high for _, high, _ in by_high],
+            "high_keys": [key for _, _, key in by_high],
+            "left": cls._build(left),
+            "right": cls._build(right),
+        }
+
+    def stab(self, point: float) -> list:
+        """Keys of every interval containing ``point``."""
+        keys = []
+        node = self.root
+        while node is not None:
+            if point < node["center"]:
+                keys.extend(node["low_keys"][: bisect_right(node["lows"], point)])
+                node = node["left"]
+            elif point > node["center"]:
+                keys.extend(node["high_keys"][: bisect_right(node["highs"], -point)])
+                node = node["right"]
+            else:
+                keys.extend(node["low_keys"])
+                break
+        return keys
+
+
+class PredicateIndex:
+    """Interval tree on price plus inverted index on location words for a set of saved searches."""
+
+    def __init__(self, searches):
+        searches = list(searches)
+        intervals = []
+        self.postings: dict[str, list[tuple[int, frozenset]]] = {}
+        self.anywhere: set[int] = set()
+        frequency = Counter(word for *_, terms in searches for term in terms for word in set(term.split()))
+        for search_id, min_price, max_price, terms in searches:
+            low = -math.inf if min_price is None else min_price
+            high = math.inf if max_price is None else max_price
+            intervals.append((low, high, search_id))
+            if not terms:
+                self.anywhere.add(search_id)
+            for term in terms:
+                words = frozenset(term.split())
+                # A term is found through its rarest word, so "area 12" is not checked for every "area"
+                rarest = min(words, key=lambda word: (frequency[word], word))
+                self.postings.setdefault(rarest, []).append((search_id, words))
+        self.prices = IntervalTree(intervals)
+        self.size = len(intervals)
+
+    def match(self, price: float, location: str) -> set[int]:
+        words = location_words(location)
+        by_location = set(self.anywhere)
+        for word in words:
+            for search_id, term in self.postings.get(word, ()):
+                if term <= words:
+                    by_location.add(search_id)
+        if not by_location:
+            return set()
+        return {search_id for search_id in self.prices.stab(float(price)) if search_id in by_location}
+
+
+_EMPTY = {False: PredicateIndex([]), True: PredicateIndex([])}
+_indexes: dict[str, tuple[str | None, dict[bool, PredicateIndex]]] = {}
+
+
+def _dialect_insert():
+    return postgresql.insert if db.session.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def bump_version() -> None:
+    """Tell every worker to rebuild its index. Call in the transaction that adds a saved search."""
+    table = SavedSearchIndexVersion.__table__
+    statement = _dialect_insert()(table).values(id=1, version=new_version())
+    db.session.execute(
+        statement.on_conflict_do_update(index_elements=[table.c.id], set_={"version": statement.excluded.version})
+    )
+
+
+def get_indexes() -> dict[bool, PredicateIndex]:
+    """This worker's predicate indexes keyed by verified-only flag, rebuilt if a search was added since."""
+    version = db.session.execute(
+        select(SavedSearchIndexVersion.version).where(SavedSearchIndexVersion.id == 1)
+    ).scalar()
+    key = str(db.engine.url)
+    cached = _indexes.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    if version is None:
+        indexes = _EMPTY
+    else:
+        searches = {False: [], True: []}
+        rows = db.session.execute(
+            select(
+                SavedSearch.id,
+                SavedSearch.min_price,
+                SavedSearch.max_price,
+                SavedSearch.location_terms,
+                SavedSearch.verified_only,
+            )
+        )
+        for search_id, min_price, max_price, terms, verified_only in rows:
+            searches[bool(verified_only)].append((search_id, min_price, max_price, terms or []))
+        indexes = {flag: PredicateIndex(flagged) for flag, flagged in searches.items()}
+    _indexes[key] = (version, indexes)
+    return indexes
+
+
+def _queue(listings, flags) -> int:
+    indexes = get_indexes()
+    selects = []
+    for listing in listings:
+        search_ids = set()
+        for flag in flags(listing):
+            search_ids |= indexes[flag].match(listing.price, listing.location)
+        if search_ids:
+            selects.append(
+                select(SavedSearch.user_id, SavedSearch.id, literal(listing.id)).where(
+                    SavedSearch.id.in_(sorted(search_ids)), SavedSearch.user_id != listing.owner_id
+                )
+            )
+    if not selects:
+        return 0
+    source = selects[0] if len(selects) == 1 else union_all(*selects)
+    # Two helpers verifying the same listing at once both try to queue its matches; the second one is skipped
+    result = db.session.execute(
+        _dialect_insert()(SavedSearchMatch.__table__)
+        .from_select(["user_id", "saved_search_id", "listing_id"], source)
+        .on_conflict_do_nothing(index_elements=["saved_search_id", "listing_id"])
+    )
+    return result.rowcount
+
+
+def queue_new_listing(listing) -> int:
+    """Queue inbox matches for a listing that was just added to the session. Returns how many were queued."""
+    db.session.flush()
+    return _queue([listing], lambda row: (False, True) if row.verified else (False,))
+
+
+def queue_verified(listings) -> int:
+    """Queue verified-only matches for listings that just became verified.
+
+    ``listings`` are rows or models with ``id``, ``owner_id``, ``location`` and ``price``.
+    """
+    return _queue(listings, lambda row: (True,))
+
+
+def load() -> int:
+    """Build this worker's index ahead of the first listing; returns how many saved searches it holds."""
+    return sum(index.size for index in get_indexes().values())
@@ -0,0 +1,214 @@
+"""In-place upgrade of databases created by an older version of the models.
+
+``db.create_all()`` creates missing tables but never alters existing ones. A
+database from an earlier release would therefore lack columns such as
+``listings.duplicate_of_id`` or ``listings.version``, and every query touching
+them would fail. ``upgrade()`` runs right after ``create_all`` in ``create_app``
+and brings existing tables up to date:
+
+* missing columns are added with ``ALTER TABLE ... ADD COLUMN``. NOT NULL
+  columns get the constant from ``BACKFILL`` as their value on existing rows,
+  and a NOT NULL column without an entry there raises, so startup fails loudly.
+* missing indexes are created.
+* foreign keys whose ``ON DELETE`` rule differs from the model are fixed. On
+  PostgreSQL the constraint is dropped and recreated. SQLite cannot alter a
+  constraint, so the table is rebuilt from the model and its rows copied over.
+  Without this, the database-side cascades the delete routes rely on would be
+  missing and deletes would fail with a foreign-key error.
+
+``backfill_price_buckets()`` then fills a newly created
+``listing_price_buckets`` table from the existing listings. Each applied change
+is printed at startup.
+"""
+
+import logging
+from collections import Counter
+
+from sqlalchemy import inspect, select
+from sqlalchemy.schema import CreateTable
+
+from . import listing_stats
+from .database import db
+from .models import Listing, ListingPriceBucket
+
+logger = logging.getLogger(__name__)
+
+# Values given to NOT NULL columns on rows that existed before the column was added
+BACKFILL = {
+    # Any constant works: the ETag also carries the row id, and edits replace it with a random token
+    ("listings", "version"): "0" * 32,
+    ("events", "version"): "0" * 32,
+}
+
+
+def _column_ddl(column, dialect) -> str:
+    quote = dialect.identifier_preparer.quote
+    ddl = f"{quote(column.name)} {column.type.compile(dialect=dialect)}"
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f" REFERENCES {quote(target.table.name)} ({quote(target.name)})"
+        if foreign_key.ondelete:
+            ddl += f" ON DELETE {foreign_key.ondelete}"
+    if not column.nullable:
+        value = BACKFILL.get((column.table.name, column.name))
+        if value is None:
+            raise RuntimeError(
+                f"Cannot add NOT NULL column {column.table.name}.{column.name} to an existing table: "
+                "add a value for it to schema_upgrade.BACKFILL"
+            )
+        ddl += f" DEFAULT '{value}' NOT NULL"
+    return ddl
+
+
+def _rule(value) -> str:
+    return (value or "NO ACTION").upper()
+
+
+def _existing_foreign_keys(connection, table_name, inspector) -> list[tuple[str, str, str | None]]:
+    """(column, ON DELETE rule, constraint name) of every single-column foreign key in the database."""
+    if connection.dialect.name == "sqlite":
+        # Reflection parses the rule only from table-level constraints, so a column added with
+        # ADD COLUMN ... REFERENCES ... ON DELETE looks rule-less; SQLite's own parse of the DDL is exact
+        quote = connection.dialect.identifier_preparer.quote
+        rows = connection.exec_driver_sql(f"PRAGMA foreign_key_list({quote(table_name)})").all()
+        sizes = Counter(row[0] for row in rows)
+        return [(row[3], _rule(row[6]), None) for row in rows if sizes[row[0]] == 1]
+    return [
+        (existing["constrained_columns"][0], _rule(existing["options"].get("ondelete")), existing["name"])
+        for existing in inspector.get_foreign_keys(table_name)
+        if len(existing["constrained_columns"]) == 1
+    ]
+
+
+def _mismatched_foreign_keys(connection, table, inspector) -> list:
+    """(column, model foreign key, constraint name) where the database's ON DELETE rule differs from the model."""
+    mismatched = []
+    for column_name, rule, constraint_name in _existing_foreign_keys(connection, table.name, inspector):
+        column = table.columns.get(column_name)
+        wanted = next(iter(column.foreign_keys), None) if column is not None else None
+        if wanted is not None and _rule(wanted.ondelete) != rule:
+            mismatched.append((column, wanted, constraint_name))
+    return mismatched
+
+
+def _upgrade_foreign_keys(connection, table, mismatched) -> list[str]:
+    quote = connection.dialect.identifier_preparer.quote
+    applied = []
+    for column, wanted, constraint_name in mismatched:
+        if connection.dialect.name != "postgresql":
+            logger.warning(
+                "%s.%s should be ON DELETE %s but the existing table cannot be altered in place; "
+                "rebuild the table to apply it",
+                table.name,
+                column.name,
+                _rule(wanted.ondelete),
+            )
+            continue
+        name = quote(constraint_name)
+        statement = (
+            f"ALTER TABLE {quote(table.name)} DROP CONSTRAINT {name}, "
+            f"ADD CONSTRAINT {name} FOREIGN KEY ({quote(column.name)}) "
+            f"REFERENCES {quote(wanted.column.table.name)} ({quote(wanted.column.name)}) "
+            f"ON DELETE {_rule(wanted.ondelete)}"
+        )
+        connection.exec_driver_sql(statement)
+        applied.append(statement)
+    return applied
+
+
+def _rebuild_sqlite_tables(engine, tables) -> list[str]:
+    """Recreate SQLite tables from the models so their foreign keys get the model's ON DELETE rules.
+
+    SQLite cannot alter a constraint, so this follows its documented procedure in
+    one transaction with foreign keys off: create the new table under a temporary
+    name, copy the rows, drop the old table, rename the new one, recreate the
+    indexes and check every reference before committing.
+    """
+    applied = []
+    with engine.connect() as connection:
+        quote = connection.dialect.identifier_preparer.quote
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        connection.commit()
+        try:
+            # pysqlite would leave the DDL outside the transaction; BEGIN explicitly so a failure leaves no trace
+            connection.exec_driver_sql("BEGIN")
+            for table in tables:
+                name = quote(table.name)
+                temporary = quote(f"_upgrade_{table.name}")
+                ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+                connection.exec_driver_sql(ddl.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {temporary} ", 1))
+                existing = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({name})")}
+                columns = ", ".join(quote(column.name) for column in table.columns if column.name in existing)
+                connection.exec_driver_sql(f"INSERT INTO {temporary} ({columns}) SELECT {columns} FROM {name}")
+                connection.exec_driver_sql(f"DROP TABLE {name}")
+                connection.exec_driver_sql(f"ALTER TABLE {temporary} RENAME TO {name}")
+                for index in table.indexes:
+                    index.create(connection)
+                applied.append(f"Rebuilt {table.name} with the model's ON DELETE rules")
+            broken = connection.exec_driver_sql("PRAGMA foreign_key_check").all()
+            if broken:
+                raise RuntimeError(
+                    f"Cannot rebuild {', '.join(table.name for table in tables)}: "
+                    f"{len(broken)} rows reference missing rows, e.g. in {broken[0][0]}"
+                )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+            connection.commit()
+    return applied
+
+
+def upgrade(engine) -> list[str]:
+    """Add missing columns, indexes and ON DELETE rules to existing tables. Returns what was applied."""
+    applied = []
+    rebuild = []
+    with engine.begin() as connection:
+        quote = connection.dialect.identifier_preparer.quote
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    statement = f"ALTER TABLE {quote(table.name)} ADD COLUMN {_column_ddl(column, connection.dialect)}"
+                    connection.exec_driver_sql(statement)
+                    applied.append(statement)
+
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            mismatched = _mismatched_foreign_keys(connection, table, inspector)
+            if mismatched and connection.dialect.name == "sqlite":
+                # The rebuild creates the indexes too
+                rebuild.append(table)
+                continue
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+                    applied.append(f"CREATE INDEX {index.name}")
+            applied.extend(_upgrade_foreign_keys(connection, table, mismatched))
+    if rebuild:
+        applied.extend(_rebuild_sqlite_tables(engine, rebuild))
+    return applied
+
+
+def backfill_price_buckets() -> list[str]:
+    """Count existing listings into ``listing_price_buckets`` when that table is empty and listings are not.
+
+    ``create_all`` adds the table empty to a database that already has listings;
+    without this the statistics would miss them, and later verify or delete calls
+    would subtract them from buckets that never counted them. Needs an app context.
+    """
+    if db.session.execute(select(ListingPriceBucket.id).limit(1)).first() is not None:
+        return []
+    if db.session.execute(select(Listing.id).limit(1)).first() is None:
+        return []
+    counted = listing_stats.rebuild()
+    return [f"Counted {counted} existing listings into listing_price_buckets"]
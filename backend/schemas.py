@@ -2,7 +2,7 @@ import os
 from marshmallow import fields, post_dump
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 
-from .models import Comment, Event, Listing, User
+from .models import Comment, Event, Listing, SavedSearch, SavedSearchMatch, User
 
 
 class BaseSchema(SQLAlchemyAutoSchema):
@@ -17,7 +17,8 @@ class BaseSchema(SQLAlchemyAutoSchema):
 class UserSchema(BaseSchema):
     class Meta(BaseSchema.Meta):
         model = User
-        exclude = ("password_hash",)
+        # Relationship id lists would lazy-load every listing, event and comment of the user
+        exclude = ("password_hash", "listings", "events", "comments")
 
 
 def convert_photo_urls(photos, base_url=None):
@@ -51,6 +52,8 @@ def convert_photo_urls(photos, base_url=None):
 class ListingSchema(BaseSchema):
     class Meta(BaseSchema.Meta):
         model = Listing
+        # Lease columns change without a version bump; keeping them out keeps detail ETags valid
+        exclude = ("signature", "lsh_bands", "claimed_by_id", "claim_expires_at")
 
     owner = fields.Nested(UserSchema, only=("id", "full_name", "email", "role"))
     price = fields.Float()
@@ -85,3 +88,16 @@ class CommentSchema(BaseSchema):
     listing = fields.Nested(ListingSchema, only=("id", "title"), allow_none=True)
     event = fields.Nested(EventSchema, only=("id", "title"), allow_none=True)
 
+
+class SavedSearchSchema(BaseSchema):
+    class Meta(BaseSchema.Meta):
+        model = SavedSearch
+
+
+class SavedSearchMatchSchema(BaseSchema):
+    class Meta(BaseSchema.Meta):
+        model = SavedSearchMatch
+
+    listing = fields.Nested(
+        ListingSchema, only=("id", "title", "price", "location", "photos", "verified", "created_at", "owner")
+    )
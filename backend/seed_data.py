@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta, timezone
 
+from . import dedup, listing_stats
 from .database import db
 from .models import Event, Listing, User
 
@@ -65,6 +66,9 @@ def seed():
     )
 
     db.session.add_all([listing, unverified_listing, event, event2])
+    for seeded in (listing, unverified_listing):
+        listing_stats.record_listing(seeded)
+        dedup.index_listing(seeded, dedup.signature_for_listing(seeded.description, seeded.photos))
     db.session.commit()
 
     print("✅ Seed data created successfully.")
@@ -0,0 +1,312 @@
+"""Precomputed "similar listings" vector index.
+
+Every listing is turned into one L2-normalised float32 row: hashed TF-IDF of its
+title and description, hashed location tokens, and a soft one-hot of its
+log-price. Rows live in memory-mapped files under ``SIMILAR_LISTINGS_INDEX_DIR``
+so all gunicorn workers share one copy through the page cache.
+
+``python -m backend.similarity`` builds the index offline. After that,
+create_listing appends rows and delete_listing zeroes them; both take a file lock,
+so several worker processes can write safely. Readers reopen their mappings only
+when ``meta.json`` changes.
+"""
+
+import json
+import math
+import os
+import re
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from .database import db
+from .models import Listing
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines run a single process
+    fcntl = None
+
+TEXT_DIMS = 256
+LOCATION_DIMS = 16
+PRICE_BINS = 8
+DIMS = TEXT_DIMS + LOCATION_DIMS + PRICE_BINS
+LOCATION_WEIGHT = 0.5
+PRICE_WEIGHT = 0.4
+PRICE_CENTERS = np.linspace(math.log(200), math.log(3000), PRICE_BINS)
+PRICE_SPREAD = (PRICE_CENTERS[1] - PRICE_CENTERS[0]) * 0.75
+BUILD_CHUNK_SIZE = 10_000
+MIN_CAPACITY = 1024
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _hashed(tokens, dims: int) -> np.ndarray:
+    return np.fromiter((zlib.crc32(token.encode("utf-8")) % dims for token in tokens), dtype=np.int64)
+
+
+def _text_slots(title: str, description: str) -> np.ndarray:
+    return _hashed(_WORD_RE.findall(f"{title or ''} {description or ''}".lower()), TEXT_DIMS)
+
+
+def vectorize(title: str, description: str, location: str, price: float, idf: np.ndarray) -> np.ndarray:
+    """Feature row for one listing using the stored IDF weights."""
+    vector = np.zeros(DIMS, dtype=np.float32)
+
+    text = np.bincount(_text_slots(title, description), minlength=TEXT_DIMS).astype(np.float32) * idf
+    norm = np.linalg.norm(text)
+    if norm:
+        vector[:TEXT_DIMS] = text / norm
+
+    slots = _hashed(_WORD_RE.findall((location or "").lower()), LOCATION_DIMS)
+    if len(slots):
+        location_part = np.bincount(slots, minlength=LOCATION_DIMS).astype(np.float32)
+        vector[TEXT_DIMS:TEXT_DIMS + LOCATION_DIMS] = LOCATION_WEIGHT * location_part / np.linalg.norm(location_part)
+
+    price_part = np.exp(-(((math.log1p(max(float(price), 0.0)) - PRICE_CENTERS) / PRICE_SPREAD) ** 2))
+    vector[TEXT_DIMS + LOCATION_DIMS:] = PRICE_WEIGHT * price_part / np.linalg.norm(price_part)
+
+    return vector / np.linalg.norm(vector)
+
+
+class SimilarityIndex:
+    """Memory-mapped listing vectors in one directory, shared between processes."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, "meta.json")
+        self._meta_mtime = None
+        self.meta = None
+        self.ids = None
+        self.vectors = None
+        self.idf = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"gen{self.meta['generation']}-{name}")
+
+    def _open(self, mode: str) -> None:
+        capacity = self.meta["capacity"]
+        self.ids = np.memmap(self._path("ids.i64"), dtype=np.int64, mode=mode, shape=(capacity,))
+        self.vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode=mode, shape=(capacity, DIMS))
+        self.idf = np.load(self._path("idf.npy"))
+
+    def refresh(self) -> bool:
+        """Reload the metadata and remap the files if another process changed them."""
+        try:
+            mtime = os.stat(self.meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime != self._meta_mtime:
+            previous = self.meta
+            with open(self.meta_path, encoding="utf-8") as handle:
+                self.meta = json.load(handle)
+            if (
+                previous is None
+                or previous["generation"] != self.meta["generation"]
+                or previous["capacity"] != self.meta["capacity"]
+            ):
+                self._open("r")
+            self._meta_mtime = mtime
+        return True
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, "write.lock"), "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_meta(self, meta: dict) -> None:
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(meta, handle)
+        os.replace(tmp_path, self.meta_path)
+
+    def row_of(self, listing_id: int) -> int | None:
+        rows = np.flatnonzero(self.ids[: self.meta["count"]] == listing_id)
+        return int(rows[0]) if len(rows) else None
+
+    def append(self, listing_id: int, vector: np.ndarray) -> None:
+        with self._locked():
+            self._meta_mtime = None
+            self.refresh()
+            row = self.row_of(listing_id)
+            if row is not None:
+                # A build that ran while the listing was being created may already hold it; a zeroed
+                # row belongs to a deleted listing whose id was reused, so it is overwritten
+                if self.vectors[row].any():
+                    return
+                self._open("r+")
+                self.vectors[row] = vector
+                self.vectors.flush()
+                self._write_meta(self.meta)
+                self._meta_mtime = None
+                return
+            meta = dict(self.meta)
+            if meta["count"] == meta["capacity"]:
+                meta["capacity"] *= 2
+                os.truncate(self._path("ids.i64"), meta["capacity"] * 8)
+                os.truncate(self._path("vectors.f32"), meta["capacity"] * DIMS * 4)
+            self.meta = meta
+            self._open("r+")
+            self.ids[meta["count"]] = listing_id
+            self.vectors[meta["count"]] = vector
+            self.ids.flush()
+            self.vectors.flush()
+            meta["count"] += 1
+            self._write_meta(meta)
+            self._meta_mtime = None
+
+    def remove(self, listing_id: int) -> None:
+        with self._locked():
+            self._meta_mtime = None
+            self.refresh()
+            row = self.row_of(listing_id)
+            if row is None:
+                return
+            self._open("r+")
+            self.vectors[row] = 0
+            self.vectors.flush()
+            self._write_meta(self.meta)
+            self._meta_mtime = None
+
+    def remove_many(self, listing_ids) -> None:
+        with self._locked():
+            self._meta_mtime = None
+            self.refresh()
+            rows = np.flatnonzero(np.isin(self.ids[: self.meta["count"]], np.asarray(list(listing_ids), dtype=np.int64)))
+            if not len(rows):
+                return
+            self._open("r+")
+            self.vectors[rows] = 0
+            self.vectors.flush()
+            self._write_meta(self.meta)
+            self._meta_mtime = None
+
+    def top_k(self, vector: np.ndarray, k: int, exclude_id: int | None = None) -> list[tuple[int, float]]:
+        count = self.meta["count"]
+        if not count:
+            return []
+        scores = np.asarray(self.vectors[:count] @ vector)
+        if exclude_id is not None:
+            scores[self.ids[:count] == exclude_id] = -np.inf
+        k = min(k, count)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(self.ids[row]), float(scores[row])) for row in best if scores[row] > 0]
+
+
+_indexes: dict[str, SimilarityIndex] = {}
+
+
+def get_index() -> SimilarityIndex:
+    directory = current_app.config["SIMILAR_LISTINGS_INDEX_DIR"]
+    if directory not in _indexes:
+        _indexes[directory] = SimilarityIndex(directory)
+    return _indexes[directory]
+
+
+def _listing_vector(listing: Listing, idf: np.ndarray) -> np.ndarray:
+    return vectorize(listing.title, listing.description, listing.location, listing.price, idf)
+
+
+def add_listing(listing: Listing) -> None:
+    """Append a newly committed listing; does nothing until the index has been built."""
+    index = get_index()
+    if index.refresh():
+        index.append(listing.id, _listing_vector(listing, index.idf))
+
+
+def remove_listing(listing_id: int) -> None:
+    index = get_index()
+    if index.refresh():
+        index.remove(listing_id)
+
+
+def remove_listings(listing_ids) -> None:
+    index = get_index()
+    if index.refresh():
+        index.remove_many(listing_ids)
+
+
+def similar_to(listing: Listing, k: int) -> list[tuple[int, float]] | None:
+    """Top-k (listing_id, cosine) pairs, or None when the index has not been built."""
+    index = get_index()
+    if not index.refresh():
+        return None
+    row = index.row_of(listing.id)
+    vector = index.vectors[row] if row is not None else _listing_vector(listing, index.idf)
+    return index.top_k(np.asarray(vector), k, exclude_id=listing.id)
+
+
+def build(directory: str | None = None) -> int:
+    """Rebuild the index from the listings table in two streaming passes. Returns the row count."""
+    directory = directory or current_app.config["SIMILAR_LISTINGS_INDEX_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    index = SimilarityIndex(directory)
+    columns = select(Listing.id, Listing.title, Listing.description, Listing.location, Listing.price)
+
+    document_frequency = np.zeros(TEXT_DIMS, dtype=np.int64)
+    total = 0
+    for chunk in db.session.execute(columns.execution_options(yield_per=BUILD_CHUNK_SIZE)).partitions():
+        for _, title, description, _, _ in chunk:
+            document_frequency[np.unique(_text_slots(title, description))] += 1
+        total += len(chunk)
+    idf = (np.log((1 + total) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    with index._locked():
+        previous = None
+        if index.exists():
+            with open(index.meta_path, encoding="utf-8") as handle:
+                previous = json.load(handle)
+        index.meta = {
+            "generation": (previous["generation"] + 1) if previous else 1,
+            "capacity": max(MIN_CAPACITY, int(total * 1.25)),
+            "count": 0,
+        }
+        np.save(index._path("idf.npy"), idf)
+        for name, size in (("ids.i64", 8), ("vectors.f32", DIMS * 4)):
+            with open(index._path(name), "wb") as handle:
+                handle.truncate(index.meta["capacity"] * size)
+        index._open("r+")
+
+        count = 0
+        rows = db.session.execute(columns.order_by(Listing.id).execution_options(yield_per=BUILD_CHUNK_SIZE))
+        for chunk in rows.partitions():
+            for listing_id, title, description, location, price in chunk:
+                if count == index.meta["capacity"]:
+                    break  # listings created between the two passes are appended by create_listing
+                index.ids[count] = listing_id
+                index.vectors[count] = vectorize(title, description, location, price, idf)
+                count += 1
+        index.ids.flush()
+        index.vectors.flush()
+        index.meta["count"] = count
+        index._write_meta(index.meta)
+
+        if previous:
+            for name in ("ids.i64", "vectors.f32", "idf.npy"):
+                stale = os.path.join(directory, f"gen{previous['generation']}-{name}")
+                if os.path.exists(stale):
+                    os.remove(stale)
+    _indexes.pop(directory, None)
+    return count
+
+
+if __name__ == "__main__":
+    from .app import create_app
+
+    app = create_app()
+    with app.app_context():
+        built = build()
+        print(f"✅ Built similar-listings index with {built} listings.")
@@ -0,0 +1,56 @@
+"""Bulk removal of spam accounts and everything they own.
+
+The database does the heavy lifting: users, listings, events and comments are
+linked with ``ON DELETE CASCADE`` foreign keys, so a single ``DELETE FROM users``
+removes the whole graph. The statements issued here stay constant however many
+rows the accounts own; only the derived data (price buckets, row versions of
+listings and events the cascade touches, the similar-listings index and the
+detail cache) is patched up in bulk around that delete.
+"""
+
+from sqlalchemy import delete, select, update
+
+from . import listing_stats, similarity
+from .cache import detail_cache
+from .database import db
+from .models import Comment, Event, Listing, User, new_version
+
+
+def remove_users(user_ids: list[int]) -> dict:
+    """Delete the given users with all their listings, events and comments. Returns row counts."""
+    listings = db.session.execute(
+        select(Listing.id, Listing.location, Listing.verified, Listing.price).where(Listing.owner_id.in_(user_ids))
+    ).all()
+    event_ids = db.session.execute(select(Event.id).where(Event.created_by_id.in_(user_ids))).scalars().all()
+
+    listing_stats.forget_rows((location, verified, price) for _, location, verified, price in listings)
+    # The cascade also removes the users' comments on other people's listings and events and clears
+    # duplicate_of_id on copies of their listings; bump those rows so cached detail payloads expire
+    removed_comments = select(Comment).where(Comment.user_id.in_(user_ids)).subquery()
+    db.session.execute(
+        update(Listing)
+        .where(
+            Listing.id.in_(select(removed_comments.c.listing_id))
+            | Listing.duplicate_of_id.in_(select(Listing.id).where(Listing.owner_id.in_(user_ids)).scalar_subquery())
+        )
+        .values(version=new_version())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(Event)
+        .where(Event.id.in_(select(removed_comments.c.event_id)))
+        .values(version=new_version())
+        .execution_options(synchronize_session=False)
+    )
+    removed = db.session.execute(delete(User).where(User.id.in_(user_ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+
+    listing_ids = [row.id for row in listings]
+    similarity.remove_listings(listing_ids)
+    for listing_id in listing_ids:
+        detail_cache.discard("listing", listing_id)
+    for event_id in event_ids:
+        detail_cache.discard("event", event_id)
+
+    return {"users": removed.rowcount, "listings": len(listing_ids), "events": len(event_ids)}
+
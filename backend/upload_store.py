@@ -0,0 +1,311 @@
+"""Uploaded listing photos: sharded storage, garbage collection and usage report.
+
+New uploads are stored as ``<aa>/<bb>/<token>_<name>``, where ``aa`` and ``bb``
+are the first hex digits of a random token. That gives 65,536 directories, so
+each stays small even with millions of files. Files from the old flat layout
+stay where they are and are still served and collected.
+
+``python -m backend.upload_store gc`` marks and sweeps. The mark phase streams
+``Listing.photos`` and keeps one 64-bit hash per referenced path in a sorted
+NumPy array. The sweep then walks the tree one top-level shard at a time with
+``os.scandir`` and removes files that are unreferenced and older than the grace
+period. ``--max-shards`` bounds one run; the next run resumes from the cursor
+file.
+
+Usage is kept per top-level shard in ``upload_shard_usage``. A sweep replaces
+the row of each shard it walked with what it found, and ``save_upload`` adds
+each new file as pending. ``python -m backend.upload_store report`` sums those
+rows instead of walking the tree, so it costs the same for millions of files.
+The totals of a shard are exact as of its last sweep; files referenced or
+removed since are picked up by the next one. ``gc --dry-run`` walks the whole
+tree and reports without removing or recording anything.
+"""
+
+import argparse
+import hashlib
+import os
+import time
+import uuid
+from itertools import islice
+from urllib.parse import urlsplit
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.security import safe_join
+
+from .database import db
+from .models import Listing, UploadShardUsage
+
+URL_PREFIX = "/uploads/"
+SHARD_NAMES = [f"{value:02x}" for value in range(256)]
+CURSOR_FILE = ".gc-cursor"
+MARK_CHUNK_SIZE = 10_000
+SWEEP_BATCH_SIZE = 10_000
+USAGE_KINDS = ("", "referenced_", "pending_")
+
+
+def upload_dir() -> str:
+    return current_app.config["UPLOAD_DIR"]
+
+
+def _upsert_usage():
+    insert = postgresql.insert if db.session.get_bind().dialect.name == "postgresql" else sqlite.insert
+    return insert(UploadShardUsage.__table__)
+
+
+def save_upload(file, filename: str) -> str:
+    """Store an uploaded file under a fresh sharded name and return its URL.
+
+    The file is counted as pending in its shard's usage row; the caller commits.
+    """
+    token = uuid.uuid4().hex
+    relative = f"{token[:2]}/{token[2:4]}/{token}_{filename}"
+    path = os.path.join(upload_dir(), *relative.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file.save(path)
+
+    size = os.path.getsize(path)
+    usage = UploadShardUsage.__table__
+    statement = _upsert_usage().values(shard=token[:2], files=1, bytes=size, pending_files=1, pending_bytes=size)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[usage.c.shard],
+            set_={
+                name: usage.c[name] + statement.excluded[name]
+                for name in ("files", "bytes", "pending_files", "pending_bytes")
+            },
+        )
+    )
+    return URL_PREFIX + relative
+
+
+def relative_path(photo: str) -> str | None:
+    """Path below the upload directory that a photo URL points at, if any.
+
+    Both stored forms are accepted: ``/uploads/...`` and the absolute URL the
+    frontend builds from it.
+    """
+    path = urlsplit(photo).path if photo else ""
+    if not path.startswith(URL_PREFIX):
+        return None
+    return path[len(URL_PREFIX):] or None
+
+
+def local_path(photo: str) -> str | None:
+    """File a photo URL refers to, or None when it is external or would escape ``UPLOAD_DIR``."""
+    relative = relative_path(photo)
+    return safe_join(upload_dir(), relative) if relative else None
+
+
+def _key(relative: str) -> int:
+    return int.from_bytes(hashlib.blake2b(relative.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def touch(photos) -> None:
+    """Refresh the mtime of uploaded photos a new listing refers to.
+
+    A sweep that marked before this listing was committed then sees the files as
+    newer than its grace cutoff and leaves them alone.
+    """
+    now = time.time()
+    for photo in photos or []:
+        path = local_path(photo)
+        if path:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+
+
+def mark() -> np.ndarray:
+    """Sorted uint64 hashes of every upload path referenced by a listing."""
+    keys = []
+    rows = db.session.execute(select(Listing.photos).execution_options(yield_per=MARK_CHUNK_SIZE))
+    for chunk in rows.partitions():
+        chunk_keys = [
+            _key(relative)
+            for (photos,) in chunk
+            for photo in photos or []
+            if (relative := relative_path(photo))
+        ]
+        keys.append(np.array(chunk_keys, dtype=np.uint64))
+    return np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype=np.uint64)
+
+
+def _is_marked(marked: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    if not len(marked):
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.minimum(np.searchsorted(marked, keys), len(marked) - 1)
+    return marked[positions] == keys
+
+
+def _files(directory: str, prefix: str, recursive: bool):
+    """Yield (relative path, stat) for files below a directory without listing it in full."""
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from _files(entry.path, f"{prefix}{entry.name}/", recursive)
+            elif entry.is_file(follow_symlinks=False):
+                yield prefix + entry.name, entry.stat(follow_symlinks=False)
+
+
+def _read_cursor(root: str) -> str | None:
+    try:
+        with open(os.path.join(root, CURSOR_FILE), encoding="utf-8") as handle:
+            return handle.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_cursor(root: str, shard: str | None) -> None:
+    path = os.path.join(root, CURSOR_FILE)
+    if shard is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(f"{path}.tmp", "w", encoding="utf-8") as handle:
+        handle.write(shard)
+    os.replace(f"{path}.tmp", path)
+
+
+def _record_usage(shard: str, usage: dict) -> None:
+    """Replace a swept shard's usage row and commit.
+
+    An upload saved into the shard while it was being walked may be left out
+    until the next sweep.
+    """
+    table = UploadShardUsage.__table__
+    statement = _upsert_usage().values(shard=shard, swept_at=time.time(), **usage)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.shard],
+            set_={name: statement.excluded[name] for name in (*usage, "swept_at")},
+        )
+    )
+    db.session.commit()
+
+
+def collect_garbage(grace_seconds: float, dry_run: bool = False, max_shards: int | None = None) -> dict:
+    """Mark referenced uploads, then sweep shards; returns storage and removal totals.
+
+    The flat legacy files are swept as the shard before ``00``. With
+    ``max_shards`` only that many shards are walked and the position is kept in
+    a cursor file, so consecutive runs cover the tree in slices. Unless
+    ``dry_run`` is set, each walked shard's usage row is replaced with what is
+    left in it.
+    """
+    root = upload_dir()
+    marked = mark()
+    cutoff = time.time() - grace_seconds
+    shards = [""] + SHARD_NAMES
+    cursor = _read_cursor(root) if max_shards else None
+    start = shards.index(cursor) + 1 if cursor in shards else 0
+    todo = shards[start:start + max_shards] if max_shards else shards
+
+    report = {
+        "shards": len(todo),
+        "files": 0,
+        "bytes": 0,
+        "referenced_files": 0,
+        "referenced_bytes": 0,
+        "pending_files": 0,
+        "pending_bytes": 0,
+        "orphaned_files": 0,
+        "orphaned_bytes": 0,
+        "removed_files": 0,
+        "removed_bytes": 0,
+    }
+    for shard in todo:
+        left = {f"{kind}{unit}": 0 for kind in USAGE_KINDS for unit in ("files", "bytes")}
+        files = _files(os.path.join(root, shard) if shard else root, f"{shard}/" if shard else "", bool(shard))
+        while batch := list(islice(files, SWEEP_BATCH_SIZE)):
+            keys = np.array([_key(relative) for relative, _ in batch], dtype=np.uint64)
+            for (relative, stat), is_referenced in zip(batch, _is_marked(marked, keys)):
+                report["files"] += 1
+                report["bytes"] += stat.st_size
+                if is_referenced:
+                    kind = "referenced"
+                elif stat.st_mtime >= cutoff:
+                    kind = "pending"  # uploaded recently; the listing may not be created yet
+                else:
+                    kind = "orphaned"
+                    if not dry_run:
+                        try:
+                            os.remove(os.path.join(root, *relative.split("/")))
+                        except FileNotFoundError:
+                            continue
+                        report["removed_files"] += 1
+                        report["removed_bytes"] += stat.st_size
+                report[f"{kind}_files"] += 1
+                report[f"{kind}_bytes"] += stat.st_size
+                if kind != "orphaned":
+                    for prefix in ("", f"{kind}_"):
+                        left[f"{prefix}files"] += 1
+                        left[f"{prefix}bytes"] += stat.st_size
+        if not dry_run:
+            _record_usage(shard, left)
+
+    if max_shards and not dry_run:
+        last = start + len(todo)
+        _write_cursor(root, shards[last - 1] if last < len(shards) else None)
+    return report
+
+
+def storage_report() -> dict:
+    """Usage of the upload tree split by referenced and pending files, read from the shard totals.
+
+    Pending files were unreferenced at the last sweep of their shard or uploaded
+    since. ``shards`` counts the shards a gc run has walked; files in the others
+    are only counted if they were uploaded since this accounting was added.
+    """
+    columns = [f"{kind}{unit}" for kind in USAGE_KINDS for unit in ("files", "bytes")]
+    totals = db.session.execute(
+        select(
+            func.count(UploadShardUsage.swept_at),
+            *(func.coalesce(func.sum(UploadShardUsage.__table__.c[name]), 0) for name in columns),
+        )
+    ).one()
+    return {"shards": totals[0], **{name: int(value) for name, value in zip(columns, totals[1:])}}
+
+
+def _format(report: dict) -> str:
+    lines = [f"shards walked   {report['shards']}"]
+    for kind in (*USAGE_KINDS, "orphaned_", "removed_"):
+        if f"{kind}files" not in report:
+            continue
+        label = (kind.rstrip("_") or "total").ljust(15)
+        lines.append(f"{label} {report[kind + 'files']:>10} files {report[kind + 'bytes'] / 1e6:>12.1f} MB")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    from .app import create_app
+
+    parser = argparse.ArgumentParser(description="Collect unreferenced listing photos and report upload storage.")
+    parser.add_argument("command", choices=("gc", "report"))
+    parser.add_argument("--grace-hours", type=float, help="Keep unreferenced files younger than this")
+    parser.add_argument("--max-shards", type=int, help="Walk at most this many shards and resume there next run")
+    parser.add_argument("--dry-run", action="store_true", help="Report what gc would remove")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "report":
+            report = storage_report()
+        else:
+            grace_hours = args.grace_hours if args.grace_hours is not None else app.config["UPLOAD_GC_GRACE_HOURS"]
+            report = collect_garbage(grace_hours * 3600, dry_run=args.dry_run, max_shards=args.max_shards)
+    print(_format(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Verification work queue for helpers.
+
+``claim`` leases up to ``limit`` of the oldest unverified listings to one helper
+for ``VERIFICATION_LEASE_SECONDS``. A single ``UPDATE ... WHERE id IN (...)
+RETURNING`` does the claim. On PostgreSQL the candidate subquery uses
+``FOR UPDATE SKIP LOCKED``, so concurrent helpers walk past each other's rows
+instead of queueing on them. SQLite serializes writers, so there the update is
+atomic on its own. The outer ``WHERE`` repeats the availability test in both
+cases, so a row can only be claimed while its lease is free or expired. The
+candidate scan uses the partial ``ix_listings_verification_queue`` index, which
+only holds unverified listings.
+
+Calling ``claim`` again returns the helper's unexpired claims and renews them.
+There is no explicit release: when a lease runs out, the listing goes back to
+the queue.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import false, or_, select, update
+
+from . import listing_stats, saved_searches
+from .database import db
+from .models import Listing, new_version
+
+
+def _available(helper_id: int, now: datetime):
+    return (
+        Listing.verified == false(),
+        or_(
+            Listing.claim_expires_at.is_(None),
+            Listing.claim_expires_at < now,
+            Listing.claimed_by_id == helper_id,
+        ),
+    )
+
+
+def claim(helper_id: int, limit: int) -> list[int]:
+    """Lease up to ``limit`` unverified listings to a helper and return their ids, oldest first."""
+    now = datetime.utcnow()
+    candidates = select(Listing.id).where(*_available(helper_id, now)).order_by(Listing.id).limit(limit)
+    if db.engine.dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+    claimed = db.session.execute(
+        update(Listing)
+        .where(Listing.id.in_(candidates.scalar_subquery()), *_available(helper_id, now))
+        .values(
+            claimed_by_id=helper_id,
+            claim_expires_at=now + timedelta(seconds=current_app.config["VERIFICATION_LEASE_SECONDS"]),
+        )
+        .returning(Listing.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return sorted(claimed)
+
+
+def verify_many(helper_id: int, listing_ids: list[int]) -> list[int]:
+    """Verify every still-unverified listing in one transaction; returns the ids that changed.
+
+    Like ``verify_listing`` this moves each listing to the verified price group,
+    records the helper, bumps the version and queues matches for verified-only
+    saved searches. It also ends the listing's lease.
+    Listings that another helper verified first are left alone.
+    """
+    verified = db.session.execute(
+        update(Listing)
+        .where(Listing.id.in_(listing_ids), Listing.verified == false())
+        .values(
+            verified=True,
+            verified_by_id=helper_id,
+            version=new_version(),
+            claimed_by_id=None,
+            claim_expires_at=None,
+        )
+        .returning(Listing.id, Listing.owner_id, Listing.location, Listing.price)
+        .execution_options(synchronize_session=False)
+    ).all()
+    listing_stats.record_verifications((row.location, row.price) for row in verified)
+    saved_searches.queue_verified(verified)
+    db.session.commit()
+    return sorted(row.id for row in verified)
@@ -0,0 +1,68 @@
+"""Benchmark near-duplicate detection on synthetic listings.
+
+Run from the project root:
+
+    python -m benchmarks.bench_dedup --listings 1000000
+
+Descriptions are random word sequences; a share of them are reposts of an earlier
+listing with one word changed. The script times signature computation
+(the per-insert cost in create_listing) and the bulk LSH pass used by
+``python -m backend.dedup``, and reports recall on the planted reposts.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from backend import dedup
+
+
+def synthetic_descriptions(count: int, repost_rate: float, seed: int):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{i}" for i in range(20_000)])
+    reposts = {}
+    descriptions = []
+    for index in range(count):
+        if index and rng.random() < repost_rate:
+            source = int(rng.integers(0, index))
+            words = descriptions[source].split()
+            for position in rng.integers(0, len(words), size=1):
+                words[position] = str(rng.choice(vocabulary))
+            reposts[index] = source
+            descriptions.append(" ".join(words))
+        else:
+            descriptions.append(" ".join(rng.choice(vocabulary, size=int(rng.integers(30, 80)))))
+    return descriptions, reposts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--repost-rate", type=float, default=0.05)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    descriptions, reposts = synthetic_descriptions(args.listings, args.repost_rate, args.seed)
+    print(f"generated {args.listings:,} descriptions in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    signatures = np.vstack([dedup.minhash(dedup.tokens_for(text, [])) for text in descriptions])
+    elapsed = time.perf_counter() - started
+    print(f"signatures: {elapsed:.1f}s total, {elapsed / args.listings * 1e6:.0f}µs per listing")
+
+    started = time.perf_counter()
+    matches = dedup.find_duplicates(np.arange(args.listings, dtype=np.int64), signatures, args.threshold)
+    elapsed = time.perf_counter() - started
+    pairwise = args.listings * (args.listings - 1) // 2
+    print(f"bulk LSH pass: {elapsed:.1f}s, {len(matches):,} duplicates flagged (naive pairwise: {pairwise:,} comparisons)")
+
+    found = sum(1 for index in reposts if index in matches)
+    print(f"recall on planted reposts: {found:,}/{len(reposts):,} ({found / max(len(reposts), 1):.1%})")
+    print(f"signature matrix: {signatures.nbytes / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark removing an account that owns thousands of rows.
+
+Run from the project root:
+
+    python -m benchmarks.bench_user_removal --listings 5000 --comments-per-listing 3
+
+Compares the ORM cascade (load the user's listings, events and comments into the
+session, then delete them) with ``spam_cleanup.remove_users``, which relies on
+``ON DELETE CASCADE`` and issues a fixed number of statements.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import selectinload
+
+from backend.app import create_app
+from backend.config import Config
+from backend.database import db
+from backend.models import Comment, Event, Listing, User
+from backend.query_guard import capture_statements
+from backend.spam_cleanup import remove_users
+
+
+def seed_account(listings: int, events: int, comments_per_listing: int) -> int:
+    now = datetime.utcnow()
+    user = User(full_name="Spam Account", email=f"spam-{time.time_ns()}@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    first_listing = (db.session.query(db.func.max(Listing.id)).scalar() or 0) + 1
+    db.session.execute(Listing.__table__.insert(), [
+        {
+            "title": f"Spam {i}",
+            "description": "Too good to be true",
+            "price": 100 + i % 900,
+            "location": f"Area {i % 25}",
+            "contact": "spam@example.com",
+            "photos": [],
+            "owner_id": user.id,
+            "created_at": now,
+        }
+        for i in range(listings)
+    ])
+    db.session.execute(Event.__table__.insert(), [
+        {"title": "Spam", "description": "Spam", "start_time": now, "location": "Online", "created_by_id": user.id}
+        for _ in range(events)
+    ])
+    db.session.execute(Comment.__table__.insert(), [
+        {"content": "Message me", "user_id": user.id, "listing_id": first_listing + i // comments_per_listing}
+        for i in range(listings * comments_per_listing)
+    ])
+    db.session.commit()
+    return user.id
+
+
+def orm_cascade(user_id: int) -> None:
+    user = User.query.options(
+        selectinload(User.listings).selectinload(Listing.comments),
+        selectinload(User.listings).selectinload(Listing.lsh_bands),
+        selectinload(User.listings).selectinload(Listing.signature),
+        selectinload(User.events).selectinload(Event.comments),
+        selectinload(User.comments),
+    ).filter_by(id=user_id).one()
+    db.session.delete(user)
+    db.session.commit()
+
+
+def measure(label: str, operation, user_id: int) -> None:
+    db.session.expunge_all()
+    started = time.perf_counter()
+    with capture_statements(db.engine) as statements:
+        operation(user_id)
+    elapsed = time.perf_counter() - started
+    round_trips = len(statements)
+    rows_sent = sum(len(parameters) if many else 1 for _, parameters, many in statements)
+    print(f"{label:<22} {elapsed * 1000:>9.1f} ms  {round_trips:>5} statements  {rows_sent:>7} parameter sets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=5_000)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--comments-per-listing", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        config = type(
+            "BenchmarkConfig",
+            (Config,),
+            {
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(scratch, 'bench.db')}",
+                "SIMILAR_LISTINGS_INDEX_DIR": scratch,
+            },
+        )
+        app = create_app(config)
+        with app.app_context():
+            print(
+                f"account with {args.listings:,} listings, {args.events:,} events, "
+                f"{args.listings * args.comments_per_listing:,} comments"
+            )
+            measure("ORM cascade", orm_cascade, seed_account(args.listings, args.events, args.comments_per_listing))
+            measure(
+                "remove_users",
+                lambda user_id: remove_users([user_id]),
+                seed_account(args.listings, args.events, args.comments_per_listing),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,10 @@ export class EventService {
     return this.http.get<CommunityEvent[]>(`${this.baseUrl}/`);
   }
 
+  getEvent(eventId: number): Observable<CommunityEvent> {
+    return this.http.get<CommunityEvent>(`${this.baseUrl}/${eventId}`);
+  }
+
   createEvent(payload: CreateEventPayload): Observable<CommunityEvent> {
     return this.http.post<CommunityEvent>(`${this.baseUrl}/`, payload);
   }
@@ -28,6 +28,10 @@ export class ListingService {
     return this.http.get<Listing[]>(`${this.baseUrl}/`);
   }
 
+  getListing(listingId: number): Observable<Listing> {
+    return this.http.get<Listing>(`${this.baseUrl}/${listingId}`);
+  }
+
   createListing(payload: CreateListingPayload): Observable<Listing> {
     return this.http.post<Listing>(`${this.baseUrl}/`, payload);
   }
@@ -43,22 +43,17 @@ export class EventDetailComponent implements OnInit {
     this.isLoading.set(true);
     this.errorMessage.set(null);
 
-    this.eventService.getEvents().subscribe({
-      next: (events) => {
-        const event = events.find((e) => e.id === id);
-        if (event) {
-          this.event.set(event);
-          // Sanitize iframe URL if present
-          if (event.iframe_url) {
-            this.safeIframeUrl.set(this.sanitizer.bypassSecurityTrustResourceUrl(event.iframe_url));
-          }
-        } else {
-          this.errorMessage.set('Event not found');
+    this.eventService.getEvent(id).subscribe({
+      next: (event) => {
+        this.event.set(event);
+        // Sanitize iframe URL if present
+        if (event.iframe_url) {
+          this.safeIframeUrl.set(this.sanitizer.bypassSecurityTrustResourceUrl(event.iframe_url));
         }
         this.isLoading.set(false);
       },
-      error: () => {
-        this.errorMessage.set('Unable to load event details.');
+      error: (error) => {
+        this.errorMessage.set(error.status === 404 ? 'Event not found' : 'Unable to load event details.');
         this.isLoading.set(false);
       },
     });
@@ -41,18 +41,13 @@ export class ListingDetailComponent implements OnInit {
     this.isLoading.set(true);
     this.errorMessage.set(null);
 
-    this.listingService.getListings().subscribe({
-      next: (listings) => {
-        const listing = listings.find((l) => l.id === id);
-        if (listing) {
-          this.listing.set(listing);
-        } else {
-          this.errorMessage.set('Listing not found');
-        }
+    this.listingService.getListing(id).subscribe({
+      next: (listing) => {
+        this.listing.set(listing);
         this.isLoading.set(false);
       },
-      error: () => {
-        this.errorMessage.set('Unable to load listing details.');
+      error: (error) => {
+        this.errorMessage.set(error.status === 404 ? 'Listing not found' : 'Unable to load listing details.');
         this.isLoading.set(false);
       },
     });
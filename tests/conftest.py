@@ -13,12 +13,60 @@ from backend.database import db as _db
 from tests.factories import user_payload
 
 
+STORAGE_KEYS = ("SIMILAR_LISTINGS_INDEX_DIR", "UPLOAD_DIR", "PROFILE_DIR")
+
+
+def _storage_dirs(directory: Path) -> dict:
+    dirs = {}
+    for key in STORAGE_KEYS:
+        dirs[key] = directory / key.lower()
+        dirs[key].mkdir(exist_ok=True)
+    return dirs
+
+
+def _isolated(config_class, dirs: dict):
+    return type(f"Isolated{config_class.__name__}", (config_class,), {key: str(path) for key, path in dirs.items()})
+
+
 @pytest.fixture(scope="session")
-def app():
-    app = create_app(TestConfig)
+def app(tmp_path_factory):
+    app = create_app(_isolated(TestConfig, _storage_dirs(tmp_path_factory.mktemp("app"))))
+    # create_app seeds sample data; every test starts from the empty schema the db fixture creates
+    with app.app_context():
+        _db.drop_all()
     return app
 
 
+@pytest.fixture(autouse=True)
+def storage_dirs(app, tmp_path):
+    """Point every on-disk store at this test's tmp_path so no test writes under backend/."""
+    dirs = _storage_dirs(tmp_path)
+    for key, path in dirs.items():
+        app.config[key] = str(path)
+    return dirs
+
+
+@pytest.fixture()
+def isolated_config(storage_dirs):
+    """TestConfig with the same tmp_path stores, for tests that build their own app with create_app."""
+    return _isolated(TestConfig, storage_dirs)
+
+
+@pytest.fixture()
+def similar_index(storage_dirs):
+    return storage_dirs["SIMILAR_LISTINGS_INDEX_DIR"]
+
+
+@pytest.fixture()
+def upload_dir(storage_dirs):
+    return storage_dirs["UPLOAD_DIR"]
+
+
+@pytest.fixture()
+def profile_dir(storage_dirs):
+    return storage_dirs["PROFILE_DIR"]
+
+
 @pytest.fixture(scope="function")
 def db(app):
     with app.app_context():
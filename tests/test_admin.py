@@ -0,0 +1,74 @@
+from http import HTTPStatus
+
+from backend.models import Comment, Event, Listing, User
+from backend.query_guard import capture_statements
+from tests.factories import listing_payload
+
+
+def _user_id(payload):
+    return User.query.filter_by(email=payload["email"].lower()).one().id
+
+
+def _spam_account(client, db, register_user, listings):
+    user_id = _user_id(register_user())
+    for _ in range(listings):
+        listing = client.post("/api/listings/", json=listing_payload(owner_id=user_id)).get_json()
+        db.session.add(Comment(content="great deal", user_id=user_id, listing_id=listing["id"]))
+    db.session.add(Event(title="Spam", description="Spam", start_time=db.func.now(), location="Online", created_by_id=user_id))
+    db.session.commit()
+    return user_id
+
+
+def test_bulk_remove_deletes_whole_graph_in_constant_statements(client, db, register_user):
+    helper_id = _user_id(register_user(role="helper"))
+    small = _spam_account(client, db, register_user, listings=2)
+    large = _spam_account(client, db, register_user, listings=20)
+    kept = client.post("/api/listings/", json=listing_payload(owner_id=helper_id)).get_json()
+    db.session.add(Comment(content="spam reply", user_id=large, listing_id=kept["id"]))
+    db.session.commit()
+    kept_etag = client.get(f"/api/listings/{kept['id']}").headers["ETag"]
+
+    counts = []
+    for user_id in (small, large):
+        with capture_statements(db.engine) as statements:
+            response = client.delete("/api/admin/users", json={"helper_id": helper_id, "user_ids": [user_id]})
+        assert response.status_code == HTTPStatus.OK
+        counts.append(len(statements))
+
+    spam = [small, large]
+    assert counts[0] == counts[1]
+    assert response.get_json()["removed"] == {"users": 1, "listings": 20, "events": 1}
+    assert Listing.query.filter(Listing.owner_id.in_(spam)).count() == 0
+    assert db.session.get(Listing, kept["id"]) is not None
+    kept_detail = client.get(f"/api/listings/{kept['id']}", headers={"If-None-Match": kept_etag})
+    assert kept_detail.status_code == HTTPStatus.OK and kept_detail.get_json()["recent_comments"] == []
+    assert Event.query.filter(Event.created_by_id.in_(spam)).count() == 0
+    assert Comment.query.filter(Comment.user_id.in_(spam)).count() == 0
+    assert client.get("/api/listings/stats").get_json()["overall"]["count"] == Listing.query.count()
+
+
+def test_bulk_remove_requires_helper_and_student_targets(client, db, register_user):
+    student_id = _user_id(register_user())
+    helper_id = _user_id(register_user(role="helper"))
+
+    response = client.delete("/api/admin/users", json={"helper_id": student_id, "user_ids": [helper_id]})
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    response = client.delete("/api/admin/users", json={"helper_id": helper_id, "user_ids": [helper_id]})
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    response = client.delete("/api/admin/users", json={"helper_id": helper_id, "user_ids": [9999]})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert db.session.get(User, student_id) is not None
+
+
+def test_delete_listing_cascades_comments_in_database(client, db, register_user):
+    owner_id = _user_id(register_user())
+    listing = client.post("/api/listings/", json=listing_payload(owner_id=owner_id)).get_json()
+    db.session.add_all([Comment(content=str(n), user_id=owner_id, listing_id=listing["id"]) for n in range(5)])
+    db.session.commit()
+    db.session.expunge_all()
+
+    with capture_statements(db.engine) as statements:
+        client.delete(f"/api/listings/{listing['id']}", json={"user_id": owner_id})
+
+    assert not any(statement.lstrip().startswith("SELECT comments") for statement, _, _ in statements)
+    assert Comment.query.filter_by(listing_id=listing["id"]).count() == 0
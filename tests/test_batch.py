@@ -0,0 +1,78 @@
+from http import HTTPStatus
+
+from backend.app import create_app
+from backend.routes import batch
+from tests.factories import listing_payload, user_payload
+
+
+def test_batch_runs_items_in_order(client, db, register_user):
+    register_user()
+    response = client.post(
+        "/api/batch",
+        json={
+            "requests": [
+                {"id": "create", "method": "POST", "path": "/api/listings/", "body": listing_payload(owner_id=1)},
+                {"id": "list", "method": "GET", "path": "/api/listings/"},
+                {"id": "missing", "method": "DELETE", "path": "/api/listings/99", "body": {"user_id": 1}},
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    create, listed, missing = response.get_json()["responses"]
+    assert create["id"] == "create" and create["status"] == HTTPStatus.CREATED
+    assert [item["id"] for item in listed["body"]] == [create["body"]["id"]]
+    assert missing["status"] == HTTPStatus.NOT_FOUND
+    assert missing["body"]["error"] == "Listing not found"
+
+
+def test_batch_rejects_invalid_payloads(client, db):
+    assert client.post("/api/batch", json={"requests": []}).status_code == HTTPStatus.BAD_REQUEST
+    nested = {"requests": [{"method": "POST", "path": "/api/batch", "body": {"requests": []}}]}
+    assert client.post("/api/batch", json=nested).status_code == HTTPStatus.BAD_REQUEST
+    outside = {"requests": [{"method": "GET", "path": "/health"}]}
+    assert client.post("/api/batch", json=outside).status_code == HTTPStatus.BAD_REQUEST
+    not_a_path = {"requests": [{"method": "GET", "path": 5}]}
+    assert client.post("/api/batch", json=not_a_path).status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_batch_runs_consecutive_reads_concurrently(tmp_path, isolated_config):
+    config = type(
+        "FileConfig",
+        (isolated_config,),
+        {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'batch.db'}", "BCRYPT_LOG_ROUNDS": 4},
+    )
+    app = create_app(config)
+    client = app.test_client()
+    owner = client.post("/api/auth/register", json=user_payload()).get_json()
+
+    response = client.post(
+        "/api/batch",
+        json={
+            "parallel": True,
+            "requests": [
+                {"method": "POST", "path": "/api/listings/", "body": listing_payload(owner_id=owner["id"])},
+                {"method": "GET", "path": "/api/listings/"},
+                {"method": "GET", "path": "/api/events/"},
+                {"method": "GET", "path": "/api/listings/stats"},
+            ],
+        },
+    )
+
+    statuses = [item["status"] for item in response.get_json()["responses"]]
+    assert statuses == [HTTPStatus.CREATED, HTTPStatus.OK, HTTPStatus.OK, HTTPStatus.OK]
+    assert len(response.get_json()["responses"][1]["body"]) == 3
+
+
+def test_batch_runs_side_effecting_gets_in_order(app):
+    with app.test_request_context():
+        read_only = [
+            batch._read_only(app, {"method": "GET", "path": path})
+            for path in (
+                "/api/listings/?page=2",
+                "/api/events/3",
+                "/api/listings/verification-queue?helper_id=1",
+                "/api/listings/missing/route",
+            )
+        ]
+    assert read_only == [True, True, False, False]
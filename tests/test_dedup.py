@@ -0,0 +1,96 @@
+import hashlib
+from http import HTTPStatus
+
+from backend import dedup
+from backend.models import Listing
+from tests.factories import listing_payload
+
+DESCRIPTION = (
+    "Bright private room in a shared house five minutes from campus, utilities and wifi included, "
+    "laundry in the basement and a quiet study space for students"
+)
+
+
+def test_minhash_similarity_tracks_jaccard():
+    base = dedup.minhash(dedup.tokens_for(DESCRIPTION, []))
+    near = dedup.minhash(dedup.tokens_for(DESCRIPTION + " available now", []))
+    other = dedup.minhash(dedup.tokens_for("Two bedroom apartment downtown with parking and a balcony", []))
+
+    assert dedup.similarity(base, near) > 0.8
+    assert dedup.similarity(base, other) < 0.2
+    assert dedup.minhash(set()) is None
+
+
+def test_photo_hash_never_reads_outside_upload_dir(tmp_path):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    (upload_dir / "room.jpg").write_bytes(b"room")
+    (tmp_path / "secret.txt").write_bytes(b"secret")
+
+    assert dedup.photo_hash("/uploads/room.jpg", str(upload_dir)) == hashlib.sha256(b"room").hexdigest()
+    escaped = "/uploads/../secret.txt"
+    assert dedup.photo_hash(escaped, str(upload_dir)) == hashlib.sha256(escaped.encode()).hexdigest()
+
+
+def test_photo_hash_reads_uploads_referenced_by_absolute_url(tmp_path):
+    (tmp_path / "ab").mkdir()
+    (tmp_path / "ab" / "one.jpg").write_bytes(b"room")
+    (tmp_path / "ab" / "two.jpg").write_bytes(b"room")
+
+    first = dedup.photo_hash("https://api.example.com/uploads/ab/one.jpg", str(tmp_path))
+    second = dedup.photo_hash("http://localhost:5000/uploads/ab/two.jpg?v=2", str(tmp_path))
+
+    assert first == second == hashlib.sha256(b"room").hexdigest()
+    assert dedup.photo_hash("https://cdn.example.com/uploads/ab/missing.jpg", str(tmp_path)) == dedup.photo_hash(
+        "/uploads/ab/missing.jpg", str(tmp_path)
+    )
+
+
+def test_create_listing_flags_near_duplicate(client, db, register_user):
+    register_user()
+    photos = ["https://example.com/room.jpg"]
+    first = client.post("/api/listings/", json=listing_payload(owner_id=1, description=DESCRIPTION, photos=photos))
+    assert first.get_json()["duplicate_of_id"] is None
+    assert "lsh_bands" not in first.get_json()
+
+    repost = client.post(
+        "/api/listings/", json=listing_payload(owner_id=1, description=DESCRIPTION + "!", photos=photos)
+    )
+    assert repost.status_code == HTTPStatus.CREATED
+    assert repost.get_json()["duplicate_of_id"] == first.get_json()["id"]
+
+    unrelated = client.post("/api/listings/", json=listing_payload(owner_id=1))
+    assert unrelated.get_json()["duplicate_of_id"] is None
+
+
+def test_create_listing_rejects_duplicate_when_configured(client, db, register_user, app):
+    register_user()
+    client.post("/api/listings/", json=listing_payload(owner_id=1, description=DESCRIPTION))
+
+    app.config["LISTING_DEDUP_ACTION"] = "reject"
+    try:
+        response = client.post("/api/listings/", json=listing_payload(owner_id=1, description=DESCRIPTION))
+    finally:
+        app.config["LISTING_DEDUP_ACTION"] = "flag"
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.get_json()["duplicate_of_id"] == 1
+    assert Listing.query.count() == 1
+
+
+def test_dedup_existing_flags_later_copies(client, db, register_user, app):
+    register_user()
+    app.config["LISTING_DEDUP_ACTION"] = "off"
+    try:
+        for _ in range(3):
+            client.post("/api/listings/", json=listing_payload(owner_id=1, description=DESCRIPTION))
+        client.post("/api/listings/", json=listing_payload(owner_id=1))
+    finally:
+        app.config["LISTING_DEDUP_ACTION"] = "flag"
+
+    versions = [listing.version for listing in Listing.query.order_by(Listing.id)]
+
+    assert dedup.dedup_existing() == (4, 2)
+    listings = Listing.query.order_by(Listing.id).all()
+    assert [listing.duplicate_of_id for listing in listings] == [None, 1, 1, None]
+    assert [listing.version != version for listing, version in zip(listings, versions)] == [False, True, True, False]
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta, timezone
 from http import HTTPStatus
 
-from backend.models import Event
+from backend.models import Comment, Event
 from tests.factories import event_payload
 
 
@@ -38,3 +38,22 @@ def test_create_event_requires_iso_timestamp(client, db, register_user):
     assert response.status_code == HTTPStatus.BAD_REQUEST
     assert "ISO 8601" in response.get_json()["error"]
 
+
+def test_get_event_returns_creator_and_honors_etag(client, db, register_user):
+    user = register_user()
+    start_time = (datetime.now(timezone.utc) + timedelta(days=2)).replace(microsecond=0).isoformat()
+    event = client.post("/api/events/", json=event_payload(created_by_id=1, start_time=start_time)).get_json()
+    db.session.add(Comment(content="See you there", user_id=1, event_id=event["id"]))
+    db.session.commit()
+
+    response = client.get(f"/api/events/{event['id']}")
+    assert response.status_code == HTTPStatus.OK
+    data = response.get_json()
+    assert data["creator"]["email"] == user["email"].lower()
+    assert [comment["content"] for comment in data["recent_comments"]] == ["See you there"]
+
+    cached = client.get(f"/api/events/{event['id']}", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+
+    client.delete(f"/api/events/{event['id']}", json={"user_id": 1})
+    assert client.get(f"/api/events/{event['id']}").status_code == HTTPStatus.NOT_FOUND
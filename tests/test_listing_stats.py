@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+from backend import listing_stats
+from backend.models import ListingPriceBucket
+from backend.query_guard import capture_statements
+from tests.factories import listing_payload
+
+
+def _create(client, **overrides):
+    return client.post("/api/listings/", json=listing_payload(owner_id=1, **overrides)).get_json()
+
+
+def test_stats_track_create_verify_and_delete(client, db, register_user):
+    register_user()
+    register_user(role="helper")
+    first = _create(client, location="Downtown", price=500, verified=False)
+    _create(client, location="Downtown", price=700, verified=False)
+    _create(client, location="Walkerville", price=900)
+
+    data = client.get("/api/listings/stats").get_json()
+    assert data["overall"]["count"] == 3
+    assert data["overall"]["mean"] == 700
+    assert [(g["location"], g["verified"], g["count"]) for g in data["groups"]] == [
+        ("Downtown", False, 2),
+        ("Walkerville", True, 1),
+    ]
+
+    client.patch(f"/api/listings/{first['id']}/verify", json={"helper_id": 2})
+    data = client.get("/api/listings/stats?location=Downtown&verified=true").get_json()
+    assert data["overall"]["count"] == 1
+    assert data["overall"]["histogram"] == [{"min": 500.0, "max": 550.0, "count": 1}]
+
+    client.delete(f"/api/listings/{first['id']}", json={"user_id": 1})
+    data = client.get("/api/listings/stats?location=Downtown").get_json()
+    assert data["overall"]["count"] == 1
+    assert data["groups"][0]["verified"] is False
+
+
+def test_stats_percentiles_fall_within_one_bucket(client, db, register_user):
+    register_user()
+    for price in (100, 200, 300, 400, 500):
+        _create(client, location="Downtown", price=price)
+
+    overall = client.get("/api/listings/stats").get_json()["overall"]
+    assert 300 <= overall["median"] < 350
+    assert 100 <= overall["percentiles"]["10"] < 150
+    assert 500 <= overall["percentiles"]["90"] < 550
+
+
+def test_rebuild_matches_incremental_buckets(client, db, register_user, app):
+    register_user()
+    for price in (120, 480, 480, 9999):
+        _create(client, location="Downtown", price=price)
+    before = client.get("/api/listings/stats").get_json()
+
+    ListingPriceBucket.query.delete()
+    db.session.commit()
+    assert client.get("/api/listings/stats").get_json()["overall"]["count"] == 0
+
+    assert listing_stats.rebuild() == 4
+    assert client.get("/api/listings/stats").get_json() == before
+
+
+def test_stats_rejects_invalid_verified_filter(client, db):
+    response = client.get("/api/listings/stats?verified=maybe")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_bucket_counts_are_upserted_in_one_statement(app, db):
+    rows = [("Riverside", True, 480.0), ("Riverside", True, 490.0), ("Riverside", False, 900.0)]
+    with app.test_request_context():
+        listing_stats._add_rows(rows[:1])
+        with capture_statements(db.engine) as statements:
+            # One bucket already exists (as if another worker created it first), one is new
+            listing_stats._add_rows(rows[1:])
+        db.session.commit()
+
+    assert len(statements) == 1
+    buckets = ListingPriceBucket.query.filter_by(location="Riverside")
+    counts = {(row.verified, row.bucket): (row.count, row.total) for row in buckets}
+    assert counts == {(True, 9): (2, 970.0), (False, 18): (1, 900.0)}
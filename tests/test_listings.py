@@ -1,6 +1,6 @@
 from http import HTTPStatus
 
-from backend.models import Listing
+from backend.models import Comment, Listing
 from tests.factories import listing_payload
 
 
@@ -36,3 +36,53 @@ def test_create_listing_missing_fields(client, db, register_user):
     assert response.status_code == HTTPStatus.BAD_REQUEST
     assert "Missing required fields" in response.get_json()["error"]
 
+
+def test_get_listing_includes_owner_and_recent_comments(client, db, register_user):
+    user = register_user()
+    listing = client.post("/api/listings/", json=listing_payload(owner_id=1)).get_json()
+    for number in range(12):
+        db.session.add(Comment(content=f"comment {number}", user_id=1, listing_id=listing["id"]))
+    db.session.commit()
+
+    response = client.get(f"/api/listings/{listing['id']}")
+    assert response.status_code == HTTPStatus.OK
+    data = response.get_json()
+    assert data["owner"]["email"] == user["email"].lower()
+    assert len(data["recent_comments"]) == 10
+    assert data["recent_comments"][0]["content"] == "comment 11"
+    assert data["recent_comments"][0]["author"]["id"] == 1
+
+
+def test_get_listing_etag_tracks_verification(client, db, register_user):
+    register_user()
+    register_user(role="helper")
+    listing = client.post("/api/listings/", json=listing_payload(owner_id=1, verified=False)).get_json()
+
+    first = client.get(f"/api/listings/{listing['id']}")
+    etag = first.headers["ETag"]
+    cached = client.get(f"/api/listings/{listing['id']}", headers={"If-None-Match": etag})
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+
+    client.patch(f"/api/listings/{listing['id']}/verify", json={"helper_id": 2})
+    refreshed = client.get(f"/api/listings/{listing['id']}", headers={"If-None-Match": etag})
+    assert refreshed.status_code == HTTPStatus.OK
+    assert refreshed.headers["ETag"] != etag
+    assert refreshed.get_json()["verified"] is True
+
+    client.delete(f"/api/listings/{listing['id']}", json={"user_id": 1})
+    assert client.get(f"/api/listings/{listing['id']}").status_code == HTTPStatus.NOT_FOUND
+
+
+def test_deleting_original_expires_duplicate_detail(client, db, register_user):
+    register_user()
+    description = "Quiet furnished room near the university with parking, laundry and all utilities included"
+    original = client.post("/api/listings/", json=listing_payload(owner_id=1, description=description)).get_json()
+    copy = client.post("/api/listings/", json=listing_payload(owner_id=1, description=description)).get_json()
+    etag = client.get(f"/api/listings/{copy['id']}").headers["ETag"]
+    assert copy["duplicate_of_id"] == original["id"]
+
+    client.delete(f"/api/listings/{original['id']}", json={"user_id": 1})
+    refreshed = client.get(f"/api/listings/{copy['id']}", headers={"If-None-Match": etag})
+
+    assert refreshed.status_code == HTTPStatus.OK
+    assert refreshed.get_json()["duplicate_of_id"] is None
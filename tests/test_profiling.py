@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from backend.profiling import TOKEN_HEADER, make_token
+from tests.factories import user_payload
+
+
+@pytest.fixture(autouse=True)
+def small_ring(app, monkeypatch):
+    monkeypatch.setitem(app.config, "PROFILE_RING_SIZE", 2)
+
+
+def test_requests_are_not_profiled_without_token(client, profile_dir):
+    response = client.get("/api/listings/", headers={TOKEN_HEADER: "forged"})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert not os.listdir(profile_dir)
+
+
+def test_signed_request_writes_flame_graph_and_attribution(app, client, profile_dir):
+    payload = user_payload()
+    client.post("/api/auth/register", json=payload)
+
+    response = client.post(
+        "/api/auth/login",
+        json={"email": payload["email"], "password": payload["password"]},
+        headers={TOKEN_HEADER: make_token(app)},
+    )
+
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    summary = json.loads((profile_dir / f"{profile_id}.summary.json").read_text())
+    assert summary["request"] == "POST /api/auth/login"
+    assert summary["attribution_ms"]["bcrypt"] > 0
+
+    collapsed = (profile_dir / f"{profile_id}.collapsed").read_text().splitlines()
+    assert collapsed and all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed)
+    assert any("bcrypt" in line for line in collapsed)
+    speedscope = json.loads((profile_dir / f"{profile_id}.speedscope.json").read_text())
+    profile = speedscope["profiles"][0]
+    assert len(profile["samples"]) == len(profile["weights"]) > 0
+
+
+def test_ring_buffer_keeps_newest_profiles(app, client, profile_dir):
+    headers = {TOKEN_HEADER: make_token(app)}
+    profile_ids = [client.get("/api/listings/", headers=headers).headers["X-Profile-Id"] for _ in range(3)]
+
+    remaining = {name.split(".", 1)[0] for name in os.listdir(profile_dir)}
+    assert remaining == set(profile_ids[1:])
@@ -0,0 +1,32 @@
+from backend import query_guard
+
+
+def test_guard_passes_for_every_endpoint(app, db):
+    ids = query_guard.prepare_dataset(listings=600, events=60)
+    results = query_guard.run_guard(app, ids)
+
+    registered = {rule.endpoint for rule in app.url_map.iter_rules()} - query_guard.SKIPPED_ENDPOINTS
+    assert {result["endpoint"] for result in results} == registered
+    assert not [result for result in results if result["problems"]], query_guard.format_report(results)
+
+
+def test_explain_flags_unindexed_scans(db):
+    with db.engine.connect() as connection:
+        assert query_guard.explain_problems(
+            connection, "SELECT id FROM listings WHERE contact = ?", ("guard@example.com",)
+        ) == ["SCAN listings"]
+        assert query_guard.explain_problems(
+            connection, "SELECT id FROM users WHERE email = ?", ("guard@example.com",)
+        ) == []
+        assert query_guard.explain_problems(
+            connection, "SELECT id FROM listings WHERE contact = ?", ("x",), allow_scans={"listings"}
+        ) == []
+
+
+def test_sqlite_scan_lines_from_old_and_new_builds():
+    assert query_guard.sqlite_scanned_table("SCAN listings") == "listings"
+    assert query_guard.sqlite_scanned_table("SCAN TABLE listings") == "listings"
+    assert query_guard.sqlite_scanned_table("SCAN TABLE listings AS l") == "listings"
+    assert query_guard.sqlite_scanned_table("SCAN TABLE listings USING INDEX ix_listings_created_at") is None
+    assert query_guard.sqlite_scanned_table("SCAN listings USING COVERING INDEX ix_listings_owner_id") is None
+    assert query_guard.sqlite_scanned_table("SEARCH TABLE users USING INTEGER PRIMARY KEY (rowid=?)") is None
@@ -0,0 +1,136 @@
+import math
+import random
+from http import HTTPStatus
+
+from backend import saved_searches
+from backend.models import User
+from tests.factories import listing_payload
+
+
+def _user_id(payload):
+    return User.query.filter_by(email=payload["email"].lower()).one().id
+
+
+def _save(client, user_id, **fields):
+    response = client.post("/api/saved-searches/", json={"user_id": user_id, **fields})
+    assert response.status_code == HTTPStatus.CREATED
+    return response.get_json()["id"]
+
+
+def _inbox(client, user_id, after=0):
+    response = client.get(f"/api/saved-searches/inbox?user_id={user_id}&after={after}")
+    assert response.status_code == HTTPStatus.OK
+    return response.get_json()
+
+
+def _inbox_listings(client, user_id):
+    return [match["listing"]["id"] for match in _inbox(client, user_id)["matches"]]
+
+
+def test_interval_tree_stab_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for key in range(300):
+        low = rng.choice([-math.inf, rng.uniform(0, 2000)])
+        high = rng.choice([math.inf, (low if math.isfinite(low) else 0) + rng.uniform(0, 800)])
+        intervals.append((low, high, key))
+    tree = saved_searches.IntervalTree(intervals)
+
+    for point in [rng.uniform(-100, 3000) for _ in range(200)] + [intervals[0][1], intervals[1][0]]:
+        expected = {key for low, high, key in intervals if low <= point <= high}
+        assert sorted(tree.stab(point)) == sorted(expected)
+    assert saved_searches.IntervalTree([]).stab(10) == []
+
+
+def test_predicate_index_matches_price_and_every_word_of_a_term():
+    index = saved_searches.PredicateIndex([
+        (1, 400, 800, ["south windsor"]),
+        (2, None, 600, ["downtown", "walkerville"]),
+        (3, 700, None, []),
+        (4, None, None, saved_searches.normalize_terms(["  Area-12 ", "area 12"])),
+    ])
+
+    assert index.match(500, "South Windsor") == {1}
+    assert index.match(500, "Windsor") == set()
+    assert index.match(550, "Walkerville, Windsor") == {2}
+    assert index.match(750, "South Windsor") == {1, 3}
+    assert index.match(900, "Area 12") == {3, 4}
+    assert index.match(900, "Area 1") == {3}
+
+
+def test_new_and_verified_listings_are_queued_in_matching_inboxes(client, db, register_user):
+    owner = _user_id(register_user())
+    helper = _user_id(register_user(role="helper"))
+    anyone, careful = _user_id(register_user()), _user_id(register_user())
+    _save(client, anyone, min_price=400, max_price=800, location_terms=["Downtown"])
+    _save(client, careful, max_price=800, location_terms="downtown", verified_only=True)
+    _save(client, owner, location_terms=["Downtown"])
+
+    match = client.post(
+        "/api/listings/", json=listing_payload(owner, location="Downtown Windsor", price=650, verified=False)
+    ).get_json()
+    client.post("/api/listings/", json=listing_payload(owner, location="Downtown Windsor", price=950))
+    client.post("/api/listings/", json=listing_payload(owner, location="Riverside", price=650))
+
+    assert _inbox_listings(client, anyone) == [match["id"]]
+    assert _inbox_listings(client, careful) == []
+    assert _inbox_listings(client, owner) == []
+
+    client.patch(f"/api/listings/{match['id']}/verify", json={"helper_id": helper})
+    inbox = _inbox(client, careful)
+    assert [entry["listing"]["id"] for entry in inbox["matches"]] == [match["id"]]
+    assert inbox["matches"][0]["listing"]["verified"] is True
+    assert _inbox(client, careful, after=inbox["next_after"]) == {"matches": [], "next_after": inbox["next_after"]}
+
+
+def test_batch_verify_queues_verified_only_matches(client, db, register_user):
+    owner = _user_id(register_user())
+    helper = _user_id(register_user(role="helper"))
+    student = _user_id(register_user())
+    _save(client, student, location_terms=["Sandwich"], verified_only=True)
+    listing_ids = [
+        client.post("/api/listings/", json=listing_payload(owner, location="Sandwich", verified=False)).get_json()["id"]
+        for _ in range(2)
+    ]
+
+    client.patch("/api/listings/verify", json={"helper_id": helper, "listing_ids": listing_ids})
+
+    assert _inbox_listings(client, student) == listing_ids
+
+
+def test_index_follows_added_and_deleted_searches(client, db, register_user):
+    owner = _user_id(register_user())
+    student = _user_id(register_user())
+    first = _save(client, student, location_terms=["Tecumseh"])
+    client.post("/api/listings/", json=listing_payload(owner, location="Tecumseh"))
+
+    second = _save(client, student, min_price=100, location_terms=["LaSalle"])
+    client.post("/api/listings/", json=listing_payload(owner, location="LaSalle", price=300))
+    assert [match["saved_search_id"] for match in _inbox(client, student)["matches"]] == [first, second]
+
+    deleted = client.delete(f"/api/saved-searches/{first}", json={"user_id": student})
+    assert deleted.status_code == HTTPStatus.OK
+    client.post("/api/listings/", json=listing_payload(owner, location="Tecumseh"))
+    assert [match["saved_search_id"] for match in _inbox(client, student)["matches"]] == [second]
+    assert [search["id"] for search in client.get(f"/api/saved-searches/?user_id={student}").get_json()] == [second]
+
+
+def test_saved_search_validation(client, db, register_user, app):
+    student = _user_id(register_user())
+    other = _user_id(register_user())
+
+    invalid = client.post("/api/saved-searches/", json={"user_id": student, "min_price": 900, "max_price": 100})
+    assert invalid.status_code == HTTPStatus.BAD_REQUEST
+    invalid = client.post("/api/saved-searches/", json={"user_id": student, "location_terms": [3]})
+    assert invalid.status_code == HTTPStatus.BAD_REQUEST
+
+    search_id = _save(client, student)
+    response = client.delete(f"/api/saved-searches/{search_id}", json={"user_id": other})
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+    app.config["SAVED_SEARCH_MAX_PER_USER"] = 1
+    try:
+        response = client.post("/api/saved-searches/", json={"user_id": student})
+    finally:
+        app.config["SAVED_SEARCH_MAX_PER_USER"] = 20
+    assert response.status_code == HTTPStatus.CONFLICT
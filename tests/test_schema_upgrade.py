@@ -0,0 +1,106 @@
+from http import HTTPStatus
+
+from sqlalchemy import create_engine, inspect
+
+import backend.app
+from backend.app import create_app
+from backend.database import db
+from backend.schema_upgrade import upgrade
+
+# Tables as the first release created them, before any column or index was added
+BASELINE_SCHEMA = (
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, full_name VARCHAR(120) NOT NULL, email VARCHAR(120) NOT NULL UNIQUE,
+        password_hash VARCHAR(128) NOT NULL, role VARCHAR(50) NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL)""",
+    """CREATE TABLE listings (
+        id INTEGER PRIMARY KEY, title VARCHAR(150) NOT NULL, description TEXT NOT NULL, price FLOAT NOT NULL,
+        location VARCHAR(150) NOT NULL, contact VARCHAR(120) NOT NULL, photos JSON NOT NULL,
+        verified BOOLEAN NOT NULL, verified_by_id INTEGER REFERENCES users (id),
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, owner_id INTEGER NOT NULL REFERENCES users (id))""",
+    """CREATE TABLE events (
+        id INTEGER PRIMARY KEY, title VARCHAR(150) NOT NULL, description TEXT NOT NULL, start_time DATETIME NOT NULL,
+        location VARCHAR(150) NOT NULL, iframe_url VARCHAR(500),
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, created_by_id INTEGER NOT NULL REFERENCES users (id))""",
+    """CREATE TABLE comments (
+        id INTEGER PRIMARY KEY, content TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        user_id INTEGER NOT NULL REFERENCES users (id), listing_id INTEGER REFERENCES listings (id),
+        event_id INTEGER REFERENCES events (id))""",
+    "INSERT INTO users (id, full_name, email, password_hash, role) VALUES (1, 'Old', 'old@example.com', 'x', 'student')",
+    """INSERT INTO listings (title, description, price, location, contact, photos, verified, owner_id)
+        VALUES ('Old room', 'Listed before the upgrade', 450, 'Downtown', 'old@example.com', '[]', 0, 1)""",
+    "INSERT INTO comments (content, user_id, listing_id) VALUES ('Still free?', 1, 1)",
+)
+
+
+def _baseline_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.exec_driver_sql(statement)
+    return url, engine
+
+
+def test_upgrade_adds_missing_columns_and_indexes(tmp_path):
+    _, engine = _baseline_database(tmp_path)
+    db.metadata.create_all(engine)
+
+    applied = upgrade(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("listings")}
+    assert {"duplicate_of_id", "version", "claimed_by_id", "claim_expires_at"} <= columns
+    assert "ix_listings_verification_queue" in {index["name"] for index in inspect(engine).get_indexes("listings")}
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT version FROM listings").scalar() == "0" * 32
+    assert applied and upgrade(engine) == []
+
+
+def test_app_serves_a_baseline_database(tmp_path, isolated_config):
+    url, _ = _baseline_database(tmp_path)
+    app = create_app(type("BaselineConfig", (isolated_config,), {"SQLALCHEMY_DATABASE_URI": url}))
+
+    client = app.test_client()
+
+    response = client.get("/api/listings/")
+    assert response.status_code == HTTPStatus.OK
+    listings = response.get_json()
+    assert "Old room" in {listing["title"] for listing in listings}
+    # The new bucket table was filled from the existing listings, not just the seeded ones
+    assert client.get("/api/listings/stats").get_json()["overall"]["count"] == len(listings)
+
+
+def test_deletes_cascade_on_an_upgraded_baseline_database(tmp_path, isolated_config):
+    url, engine = _baseline_database(tmp_path)
+    app = create_app(type("BaselineConfig", (isolated_config,), {"SQLALCHEMY_DATABASE_URI": url}))
+    client = app.test_client()
+
+    with engine.connect() as connection:
+        rules = {row[3]: row[6] for row in connection.exec_driver_sql("PRAGMA foreign_key_list(comments)")}
+    assert rules == {"user_id": "CASCADE", "listing_id": "CASCADE", "event_id": "CASCADE"}
+
+    response = client.delete("/api/listings/1", json={"user_id": 1})
+    assert response.status_code == HTTPStatus.OK
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT count(*) FROM comments").scalar() == 0
+
+    # create_app seeded the helper account next to the baseline rows
+    helper = client.post("/api/auth/login", json={"email": "helper@windsorhub.ca", "password": "Password123!"})
+    response = client.delete("/api/admin/users", json={"helper_id": helper.get_json()["id"], "user_ids": [1]})
+    assert response.status_code == HTTPStatus.OK
+    assert response.get_json()["removed"]["users"] == 1
+
+
+def test_columns_added_with_their_rule_are_not_reported_again(tmp_path, caplog):
+    _, engine = _baseline_database(tmp_path)
+    db.metadata.create_all(engine)
+    upgrade(engine)
+
+    caplog.clear()
+    upgrade(engine)
+
+    assert "claimed_by_id" not in caplog.text and "duplicate_of_id" not in caplog.text
+
+
+def test_importing_the_package_does_not_build_the_app():
+    assert "app" not in vars(backend.app)
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+import numpy as np
+
+from backend import similarity
+from tests.factories import listing_payload
+
+
+def _create(client, **overrides):
+    return client.post("/api/listings/", json=listing_payload(owner_id=1, **overrides)).get_json()
+
+
+def test_similar_requires_built_index(client, db, register_user, similar_index):
+    register_user()
+    listing = _create(client)
+
+    response = client.get(f"/api/listings/{listing['id']}/similar")
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+
+
+def test_similar_ranks_by_text_location_and_price(client, db, register_user, similar_index):
+    register_user()
+    room = _create(client, description="furnished room near campus with wifi", location="University", price=600)
+    close = _create(client, description="furnished room close to campus wifi included", location="University", price=650)
+    far = _create(client, description="three bedroom house with garage and yard", location="Tecumseh", price=2400)
+    assert similarity.build() == 3
+
+    data = client.get(f"/api/listings/{room['id']}/similar").get_json()
+    assert [item["id"] for item in data] == [close["id"], far["id"]]
+    assert data[0]["similarity"] > data[1]["similarity"]
+
+
+def test_similar_index_tracks_creates_and_deletes(client, db, register_user, similar_index):
+    register_user()
+    room = _create(client, description="furnished room near campus with wifi", location="University", price=600)
+    similarity.build()
+
+    newer = _create(client, description="furnished room near campus, wifi", location="University", price=610)
+    data = client.get(f"/api/listings/{room['id']}/similar").get_json()
+    assert [item["id"] for item in data] == [newer["id"]]
+
+    client.delete(f"/api/listings/{newer['id']}", json={"user_id": 1})
+    assert client.get(f"/api/listings/{room['id']}/similar").get_json() == []
+
+
+def test_similar_grows_past_capacity(app, db, similar_index):
+    with app.app_context():
+        similarity.build()
+        index = similarity.get_index()
+        index.refresh()
+        for listing_id in range(1, similarity.MIN_CAPACITY + 10):
+            index.append(listing_id, similarity.vectorize("room", "room", "Downtown", 500, index.idf))
+
+        assert index.meta["capacity"] == similarity.MIN_CAPACITY * 2
+        assert index.row_of(similarity.MIN_CAPACITY + 5) == similarity.MIN_CAPACITY + 4
+
+
+def test_append_skips_listings_a_build_already_indexed(client, db, register_user, similar_index):
+    register_user()
+    room = _create(client, description="furnished room near campus with wifi", location="University", price=600)
+    similarity.build()
+    index = similarity.get_index()
+    index.refresh()
+    vector = np.array(index.vectors[index.row_of(room["id"])])
+
+    index.append(room["id"], vector)
+    assert index.meta["count"] == 1
+
+    index.remove(room["id"])
+    index.append(room["id"], vector)
+    assert index.meta["count"] == 1 and index.vectors[0].any()
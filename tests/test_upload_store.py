@@ -0,0 +1,111 @@
+import io
+import os
+import time
+from http import HTTPStatus
+
+from backend import upload_store
+from backend.models import User
+from tests.factories import listing_payload
+
+DAY = 24 * 3600
+
+
+def _upload(client, name="room.jpg"):
+    response = client.post(
+        "/api/listings/upload-photo",
+        data={"photo": (io.BytesIO(b"jpeg bytes " + name.encode()), name)},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    return response.get_json()["url"]
+
+
+def _age(upload_dir, url, seconds):
+    path = upload_dir / upload_store.relative_path(url)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+    return path
+
+
+def test_uploads_are_stored_in_shards_and_served(client, upload_dir):
+    url = _upload(client)
+
+    shard, subshard, name = upload_store.relative_path(url).split("/")
+    assert len(shard) == len(subshard) == 2 and name.endswith("_room.jpg")
+    assert (upload_dir / shard / subshard / name).is_file()
+    assert client.get(url).status_code == HTTPStatus.OK
+
+
+def test_gc_removes_only_old_unreferenced_files(app, client, register_user, upload_dir):
+    register_user()
+    owner_id = User.query.filter_by(role="student").first().id
+    kept, absolute, orphan, recent = (_upload(client, f"{name}.jpg") for name in ("kept", "absolute", "orphan", "recent"))
+    client.post("/api/listings/", json=listing_payload(owner_id, photos=[kept, f"https://hub.example{absolute}"]))
+    paths = {url: _age(upload_dir, url, 2 * DAY) for url in (kept, absolute, orphan)}
+    legacy = upload_dir / "20240101_120000_old.jpg"
+    legacy.write_bytes(b"flat layout")
+    os.utime(legacy, (time.time() - 2 * DAY,) * 2)
+
+    with app.app_context():
+        report = upload_store.collect_garbage(DAY)
+
+    assert report["files"] == 5
+    assert report["referenced_files"] == 2 and report["pending_files"] == 1
+    assert report["removed_files"] == report["orphaned_files"] == 2
+    assert paths[kept].exists() and paths[absolute].exists()
+    assert not paths[orphan].exists() and not legacy.exists()
+    assert (upload_dir / upload_store.relative_path(recent)).exists()
+
+
+def test_gc_resumes_from_cursor(app, db, upload_dir):
+    for shard in ("00", "01", "02"):
+        directory = upload_dir / shard / "aa"
+        directory.mkdir(parents=True)
+        (directory / "orphan.jpg").write_bytes(b"x")
+
+    with app.app_context():
+        first = upload_store.collect_garbage(0, max_shards=2)
+        second = upload_store.collect_garbage(0, max_shards=2)
+        report = upload_store.storage_report()
+
+    assert (first["shards"], first["removed_files"]) == (2, 1)  # legacy root, then "00"
+    assert (second["shards"], second["removed_files"]) == (2, 2)
+    assert report["files"] == 0
+
+
+def test_touch_ignores_paths_outside_upload_dir(app, upload_dir, tmp_path_factory):
+    secret = tmp_path_factory.mktemp("outside") / "secret.txt"
+    secret.write_bytes(b"secret")
+    os.utime(secret, (0, 0))
+    escaped = os.path.relpath(secret, upload_dir)
+
+    with app.test_request_context():
+        assert upload_store.local_path(f"/uploads/{escaped}") is None
+        upload_store.touch([f"/uploads/{escaped}", f"https://hub.example/uploads/{escaped}"])
+
+    assert secret.stat().st_mtime == 0
+
+
+def test_report_reads_shard_totals_kept_by_uploads_and_sweeps(app, client, register_user, upload_dir):
+    register_user()
+    owner_id = User.query.filter_by(role="student").first().id
+    kept, orphan, recent = (_upload(client, f"{name}.jpg") for name in ("kept", "orphan", "recent"))
+    sizes = {url: (upload_dir / upload_store.relative_path(url)).stat().st_size for url in (kept, orphan, recent)}
+
+    with app.app_context():
+        report = upload_store.storage_report()
+    assert (report["shards"], report["files"], report["pending_files"], report["referenced_files"]) == (0, 3, 3, 0)
+    assert report["bytes"] == report["pending_bytes"] == sum(sizes.values())
+
+    client.post("/api/listings/", json=listing_payload(owner_id, photos=[kept]))
+    _age(upload_dir, orphan, 2 * DAY)
+    with app.app_context():
+        upload_store.collect_garbage(DAY)
+        # A file that appears without an upload is only counted by the next sweep
+        (upload_dir / "stray.jpg").write_bytes(b"stray")
+        report = upload_store.storage_report()
+
+    assert report["shards"] == len(upload_store.SHARD_NAMES) + 1
+    assert (report["files"], report["referenced_files"], report["pending_files"]) == (2, 1, 1)
+    assert report["bytes"] == sizes[kept] + sizes[recent] and report["referenced_bytes"] == sizes[kept]
+    assert (upload_dir / upload_store.relative_path(recent)).exists()
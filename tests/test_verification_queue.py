@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+from backend.models import Listing, User
+from tests.factories import listing_payload
+
+
+def _user_id(payload):
+    return User.query.filter_by(email=payload["email"].lower()).one().id
+
+
+def _unverified_listings(client, owner_id, count, **overrides):
+    return [
+        client.post("/api/listings/", json=listing_payload(owner_id, verified=False, **overrides)).get_json()["id"]
+        for _ in range(count)
+    ]
+
+
+def _claim(client, helper_id, limit):
+    response = client.get(f"/api/listings/verification-queue?helper_id={helper_id}&limit={limit}")
+    assert response.status_code == HTTPStatus.OK
+    return [listing["id"] for listing in response.get_json()]
+
+
+def test_helpers_claim_disjoint_batches_until_leases_expire(client, db, register_user):
+    owner_id = _user_id(register_user())
+    first, second = _user_id(register_user(role="helper")), _user_id(register_user(role="helper"))
+    _unverified_listings(client, owner_id, 5)
+    queue = [listing.id for listing in Listing.query.filter_by(verified=False).order_by(Listing.id)]
+
+    first_batch = _claim(client, first, 3)
+    second_batch = _claim(client, second, 3)
+    assert first_batch == queue[:3]
+    assert second_batch == queue[3:6]
+    assert _claim(client, first, 3) == first_batch  # re-fetching renews the helper's own leases
+
+    Listing.query.filter(Listing.id.in_(first_batch)).update(
+        {Listing.claim_expires_at: datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False
+    )
+    db.session.commit()
+    assert set(_claim(client, second, 10)) == set(first_batch + second_batch)
+
+    detail = client.get(f"/api/listings/{first_batch[0]}").get_json()
+    assert "claimed_by_id" not in detail and "claim_expires_at" not in detail
+
+    student = client.get(f"/api/listings/verification-queue?helper_id={owner_id}")
+    assert student.status_code == HTTPStatus.FORBIDDEN
+
+
+def test_batch_verify_updates_listings_and_stats_in_one_call(client, db, register_user):
+    owner_id = _user_id(register_user())
+    helper_id = _user_id(register_user(role="helper"))
+    claimed = _unverified_listings(client, owner_id, 3, location="Sandwich", price=610)
+    verified_already = client.post("/api/listings/", json=listing_payload(owner_id, location="Sandwich")).get_json()
+    _claim(client, helper_id, 10)
+
+    response = client.patch(
+        "/api/listings/verify",
+        json={"helper_id": helper_id, "listing_ids": claimed + [verified_already["id"], 999_999]},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.get_json() == {
+        "verified": claimed,
+        "already_verified": [verified_already["id"]],
+        "not_found": [999_999],
+    }
+    listings = Listing.query.filter(Listing.id.in_(claimed)).all()
+    assert all(listing.verified and listing.verified_by_id == helper_id for listing in listings)
+    assert all(listing.claimed_by_id is None for listing in listings)
+    stats = client.get("/api/listings/stats?location=Sandwich").get_json()
+    assert {group["verified"]: group["count"] for group in stats["groups"]} == {True: 4}
+
+
+def test_batch_verify_requires_helper(client, db, register_user):
+    owner_id = _user_id(register_user())
+    listing_ids = _unverified_listings(client, owner_id, 1)
+
+    response = client.patch("/api/listings/verify", json={"helper_id": owner_id, "listing_ids": listing_ids})
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    response = client.patch("/api/listings/verify", json={"helper_id": owner_id, "listing_ids": []})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_single_verify_only_counts_the_first_helper(client, db, register_user):
+    owner_id = _user_id(register_user())
+    first, second = _user_id(register_user(role="helper")), _user_id(register_user(role="helper"))
+    (listing_id,) = _unverified_listings(client, owner_id, 1, location="Kingsville", price=540)
+
+    for helper_id in (first, second):
+        response = client.patch(f"/api/listings/{listing_id}/verify", json={"helper_id": helper_id})
+        assert response.status_code == HTTPStatus.OK
+        assert response.get_json()["verified"] is True
+
+    assert db.session.get(Listing, listing_id).verified_by_id == first
+    stats = client.get("/api/listings/stats?location=Kingsville").get_json()
+    assert {group["verified"]: group["count"] for group in stats["groups"]} == {True: 1}